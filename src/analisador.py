@@ -0,0 +1,73 @@
+import hashlib
+import os
+from functools import lru_cache
+
+# Analisador único de documentos e consultas. Em uma só passada sobre os tokens de
+# word_tokenize, cada token é normalizado (maiúsculas, sem ';'), descartado se for stop
+# word ou apenas pontuação e, com STEMMER, reduzido ao radical (PorterStemmer). O vocabulário é muito menor
+# que o número de tokens, então o termo de cada token distinto é memorizado em um cache
+# LRU limitado: normalização, teste de stop word e stemming são feitos uma vez por forma.
+#
+# O nltk só é importado na primeira tokenização: módulos que não analisam texto (Indexador,
+# Buscador com consultas já carregadas, avaliação) não pagam o custo da importação.
+#
+# src/config.txt: STEMMER (radicais) ou NOSTEMMER (termos originais)
+CACHE_SIZE = 1 << 16
+
+def word_tokenize(text):
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+    return nltk_word_tokenize(text)
+
+class Analyzer:
+    def __init__(self, stop_words=frozenset(), stemming=False, cache_size=CACHE_SIZE):
+        self.stop_words = stop_words
+        self.stemming = stemming
+        self.cache_size = cache_size
+        self.stemmer = None
+        if stemming:
+            from nltk.stem import PorterStemmer
+            self.stemmer = PorterStemmer()
+        # Cache por instância: analisadores com stop words ou stemming diferentes não se misturam
+        self.term = lru_cache(maxsize=cache_size)(self.normalize)
+
+    def __reduce__(self):
+        # Enviado aos processos do pool sem o cache
+        return Analyzer, (self.stop_words, self.stemming, self.cache_size)
+
+    def normalize(self, token):
+        # Termo de um token, ou None para stop words (testadas antes do stemming) e pontuação
+        term = token.upper().strip(';')
+        if term in self.stop_words or not any(character.isalnum() for character in term):
+            return None
+        if self.stemmer is not None:
+            term = self.stemmer.stem(term).upper()
+        return term
+
+    def terms(self, text):
+        term = self.term
+        return [analyzed for analyzed in map(term, word_tokenize(text)) if analyzed is not None]
+
+    def signature(self):
+        # Identifica a configuração do analisador (segmentos gerados com outra são refeitos)
+        digest = hashlib.sha256('\n'.join(sorted(self.stop_words)).encode('utf-8')).hexdigest()[:16]
+        return f"{'STEMMER' if self.stemming else 'NOSTEMMER'}-{digest}"
+
+    def cache_info(self):
+        return self.term.cache_info()
+
+def read_stemmer_choice(current_directory):
+    # Leitura da opção do stemmer do arquivo de configuração (STEMMER por padrão)
+    config_file = os.path.join(current_directory, 'src', 'config.txt')
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as file:
+            return file.readline().strip()
+    return "STEMMER"
+
+def load_analyzer(current_directory, stop_words):
+    return Analyzer(stop_words, read_stemmer_choice(current_directory) == 'STEMMER')
+
+def load_stop_words(file_path):
+    # frozenset: o teste de stop word do analisador é O(1)
+    with open(file_path, 'r') as file:
+        stop_words = frozenset(word.strip().upper() for word in file.readlines())
+    return stop_words
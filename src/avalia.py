@@ -1,138 +1,207 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from nltk.stem import PorterStemmer
-from sklearn.metrics import precision_recall_curve, f1_score, precision_score, recall_score, average_precision_score
-import ast  # Para lidar com a conversão de strings para lista
+import logging
 import os
-
-# Configurações de diretório e arquivos
-current_directory = os.getcwd()
-resultados_file = os.path.join(current_directory, 'RESULT', 'RESULTADOS.csv')
-resultados_esperados_file = os.path.join(current_directory, 'RESULT', 'expected_results.csv')
-
-# Carregar dados
-resultados = pd.read_csv(resultados_file, delimiter=';', header=None)
-resultados_esperados = pd.read_csv(resultados_esperados_file, delimiter=';', header=None)
-
-# Leitura da opção do stemmer do arquivo de configuração
-config_file = current_directory + '\\src\\config.txt'
-if os.path.exists(config_file):
-    with open(config_file, 'r') as f:
-        stemmer_choice = f.readline().strip()  # Ler a primeira linha e remover espaços em branco
-else:
-    stemmer_choice = "STEMMER"  # Se o arquivo de configuração não existir, use STEMMER por padrão
-
-# Configuração do Stemmer
-use_stemmer = True if stemmer_choice == "STEMMER" else False
-stemmer = PorterStemmer() if use_stemmer else None  # Garantir que stemmer seja instanciado corretamente
-
-# Função para pré-processamento dos dados
-def preprocess(text, stemmer=None):
-    try:
-        results_list = ast.literal_eval(text)
-        if isinstance(results_list, list):
-            if stemmer:
-                return [(0, 0, stemmer.stem(str(score))) for score in results_list]
-            else:
-                return [(0, 0, str(score)) for score in results_list]
-        else:
-            if stemmer:
-                return [(0, 0, stemmer.stem(str(text)))]
-            else:
-                return [(0, 0, str(text))]
-    except (SyntaxError, ValueError):
-        if stemmer:
-            return [(0, 0, stemmer.stem(str(text)))]
-        else:
-            return [(0, 0, str(text))]
-
-# Aplicar pré-processamento aos resultados
-resultados['Processed'] = resultados[1].apply(preprocess, stemmer=stemmer)
-
-# Preparar dados para avaliação
-resultados_flat = resultados.explode('Processed').reset_index(drop=True)
-resultados_flat[['Posicao', 'DocNumber', 'DocScore']] = pd.DataFrame(resultados_flat['Processed'].tolist(), index=resultados_flat.index)
-resultados_flat = resultados_flat.drop(['Processed', 0, 1], axis=1)
-
-# Unir resultados com esperados
-# Renomear as colunas para os nomes corretos
-resultados_esperados.columns = ['QueryNumber', 'Esperado', 'DocScore']
-
-# Eliminar a primeira linha que contém cabeçalhos
-resultados_esperados = resultados_esperados.iloc[1:]  # Seleciona todas as linhas a partir da segunda
-
-# Converter 'QueryNumber' para int64
-resultados_esperados['QueryNumber'] = resultados_esperados['QueryNumber'].astype('int64')
-
-# Agrupar resultados_flat por QueryNumber
-resultados_flat_grouped = resultados_flat.groupby('Posicao')  # Ajuste aqui conforme a estrutura dos seus dados
-
-# Inicializar listas para armazenar métricas
-precision_recall_stemmer_all = []
-f1_stemmer_all = []
-precision5_stemmer_all = []
-precision10_stemmer_all = []
-r_precision_stemmer_all = []
-map_score_stemmer_all = []
-
-# Iterar sobre cada grupo de resultados por QueryNumber
-for query, group_flat in resultados_flat_grouped:
-    # Verificar se há resultados esperados para essa query
-    if query in resultados_esperados['QueryNumber'].values:
-        # Filtrar resultados esperados pela QueryNumber atual
-        group_esperados = resultados_esperados[resultados_esperados['QueryNumber'] == query]['DocScore']
-        
-        # Verificar se há dados suficientes para calcular métricas
-        if len(group_flat) > 0 and len(group_esperados) > 0:
-            # Calcular métricas para o grupo atual
-            precision_recall_stemmer = precision_recall_curve(group_esperados, group_flat['DocScore'])
-            f1_stemmer = f1_score(group_esperados, group_flat['DocScore'])
-            precision5_stemmer = precision_score(group_esperados, group_flat['DocScore'], pos_label=1, average='binary', k=5)
-            precision10_stemmer = precision_score(group_esperados, group_flat['DocScore'], pos_label=1, average='binary', k=10)
-            r_precision_stemmer = r_precision_score(group_esperados, group_flat['DocScore'])
-            map_score_stemmer = average_precision_score(group_esperados, group_flat['DocScore'])
-            
-            # Armazenar métricas calculadas
-            precision_recall_stemmer_all.append(precision_recall_stemmer)
-            f1_stemmer_all.append(f1_stemmer)
-            precision5_stemmer_all.append(precision5_stemmer)
-            precision10_stemmer_all.append(precision10_stemmer)
-            r_precision_stemmer_all.append(r_precision_stemmer)
-            map_score_stemmer_all.append(map_score_stemmer)
-        else:
-            print(f"Dados insuficientes para calcular métricas para a Query {query}")
-
-# Calcular métricas médias se necessário
-# Exemplo de cálculo de média de precision_recall_stemmer_all:
-if len(precision_recall_stemmer_all) > 0:
-    precision_recall_stemmer_avg = np.mean(precision_recall_stemmer_all, axis=0)
-
-    # Verifique se precision_recall_stemmer_avg contém valores válidos antes de plotar
-    if isinstance(precision_recall_stemmer_avg, tuple) and len(precision_recall_stemmer_avg) > 1:
-        # Gerar relatório em Markdown ou utilizar os resultados conforme necessário
-        # Exemplo:
-        with open('RELATORIO.MD', 'w') as f:
-            f.write("# Avaliação do Sistema de Recuperação de Informação\n\n")
-            
-            f.write("## Resultados com Stemmer\n")
-            f.write(f"- **F1 Score:** {np.mean(f1_stemmer_all)}\n")
-            f.write(f"- **Precision@5:** {np.mean(precision5_stemmer_all)}\n")
-            f.write(f"- **Precision@10:** {np.mean(precision10_stemmer_all)}\n")
-            f.write(f"- **R-Precision:** {np.mean(r_precision_stemmer_all)}\n")
-            f.write(f"- **MAP:** {np.mean(map_score_stemmer_all)}\n")
-
-        # Gráfico de Precisão-Recall
-        plt.plot(precision_recall_stemmer_avg[1], precision_recall_stemmer_avg[0], marker='o')
-        plt.xlabel('Recall')
-        plt.ylabel('Precision')
-        plt.title('11-Point Precision-Recall Curve')
-        plt.savefig(f'11pontos-{stemmer_choice.lower()}.pdf')
-        plt.show()
+import numpy as np
+from analisador import read_stemmer_choice
+
+# Avaliação do sistema de recuperação. Resultados e julgamentos de relevância são lidos
+# para arrays de inteiros e unidos uma única vez pelo número da consulta (QueryNumber);
+# todas as métricas (P@5, P@10, R-Precision, MAP, MRR, F1@10 e a curva de 11 pontos de
+# precisão interpolada) são calculadas para todas as consultas em passadas vetorizadas
+# sobre os rankings concatenados, sem laço por consulta.
+#
+# Uso: python src/avalia.py  (lê RESULT\RESULTADOS.csv e RESULT\expected_results.csv e grava em AVALIA)
+RECALL_LEVELS = np.linspace(0.0, 1.0, 11)
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+def parse_integers_before(buffer, ends):
+    # Inteiros decimais que terminam imediatamente antes de cada posição de ends, lidos de
+    # trás para frente, um dígito de todos os números por passada
+    values = np.zeros(len(ends), dtype=np.int64)
+    active = np.ones(len(ends), dtype=bool)
+    positions = ends - 1
+    scale = 1
+    while active.any():
+        digits = buffer[np.maximum(positions, 0)] - np.uint8(48)
+        active &= (digits < 10) & (positions >= 0)
+        values += np.where(active, digits, 0).astype(np.int64) * scale
+        positions = positions - 1
+        scale *= 10
+    return values
+
+def load_results(file_path):
+    # RESULTADOS.csv: "consulta;[posição, DocID, similaridade]" por linha, na ordem do ranking.
+    # Cada linha tem um '[' e duas vírgulas: a consulta termina antes de ";[" e o DocID
+    # antes da segunda vírgula. Retorna (consultas, DocIDs) na ordem do arquivo.
+    with open(file_path, 'rb') as file:
+        buffer = np.frombuffer(file.read(), dtype=np.uint8)
+    brackets = np.flatnonzero(buffer == ord('['))
+    commas = np.flatnonzero(buffer == ord(','))
+    if len(commas) != 2 * len(brackets):
+        raise ValueError(f"Formato inválido em {file_path}: esperado 'consulta;[posição, DocID, similaridade]'")
+    return parse_integers_before(buffer, brackets - 1), parse_integers_before(buffer, commas[1::2])
+
+def load_judgments(file_path):
+    # expected_results.csv: "QueryNumber;DocNumber;DocScore" -> (consultas, DocIDs)
+    with open(file_path, 'r') as file:
+        next(file)
+        table = np.array(file.read().replace(';', ' ').split(), dtype=np.int64).reshape(-1, 3)
+    return table[:, 0], table[:, 1]
+
+def segment_suffix_max(values, groups, group_count):
+    # Máximo de cada posição até o fim da sua consulta (values em [0, 1], grupos crescentes):
+    # o deslocamento por grupo impede que o máximo de uma consulta passe para a anterior
+    offsets = (group_count - 1 - groups) * 2.0
+    return np.maximum.accumulate((values + offsets)[::-1])[::-1] - offsets
+
+def evaluate(result_queries, result_documents, judged_queries, judged_documents):
+    # Rankings na ordem das posições; as linhas de uma mesma consulta ficam contíguas
+    if np.any(result_queries[1:] < result_queries[:-1]):
+        order = np.argsort(result_queries, kind='stable')
+        result_queries, result_documents = result_queries[order], result_documents[order]
+    starts = np.flatnonzero(np.diff(result_queries, prepend=-1))
+    queries = result_queries[starts]
+    lengths = np.diff(starts, append=len(result_queries))
+
+    # Julgamentos das consultas presentes nos resultados
+    judged_groups = np.searchsorted(queries, judged_queries)
+    found = judged_groups < len(queries)
+    found[found] = queries[judged_groups[found]] == judged_queries[found]
+    judged_groups, judged_documents = judged_groups[found], judged_documents[found]
+    total_relevant = np.bincount(judged_groups, minlength=len(queries))
+
+    # Junção única: tabela (consulta, DocID) -> relevante, consultada por todas as linhas
+    stride = int(max(result_documents.max(initial=0), judged_documents.max(initial=0))) + 1
+    row_groups = np.repeat(np.arange(len(queries)), lengths)
+    if len(queries) * stride <= 1 << 28:
+        judged = np.zeros(len(queries) * stride, dtype=bool)
+        judged[judged_groups * stride + judged_documents] = True
+        relevant_rows = np.flatnonzero(judged[row_groups * stride + result_documents])
     else:
-        print("Não há dados suficientes para gerar a curva de precisão-recall.")
-else:
-    print("Não há dados suficientes para calcular métricas.")
-
-# Salvando os dados em CSV
-resultados_flat.to_csv(f'AVALIA\\RESULTADOS-{stemmer_choice}.csv', index=False, sep=';')
+        relevant_rows = np.flatnonzero(np.isin(row_groups * stride + result_documents,
+                                               judged_groups * stride + judged_documents))
+
+    # Todas as métricas dependem apenas das posições dos documentos relevantes: a precisão
+    # interpolada em qualquer nível de recall é máxima em um documento relevante
+    groups = row_groups[relevant_rows]
+    ranks = relevant_rows - starts[groups] + 1
+    group_starts = np.searchsorted(groups, np.arange(len(queries)))
+    group_ends = np.searchsorted(groups, np.arange(len(queries)), side='right')
+    hits = np.arange(len(groups)) - group_starts[groups] + 1
+    precision = hits / ranks
+    count = np.maximum(total_relevant, 1)
+
+    def hits_at(limit):
+        return np.bincount(groups[ranks <= limit], minlength=len(queries))
+
+    has_relevant = group_ends > group_starts
+    first_ranks = np.zeros(len(queries))
+    first_ranks[has_relevant] = ranks[group_starts[has_relevant]]
+    metrics = {
+        'p@5': hits_at(5) / 5,
+        'p@10': hits_at(10) / 10,
+        'r_precision': hits_at(total_relevant[groups]) / count,
+        'map': np.bincount(groups, weights=precision, minlength=len(queries)) / count,
+        'mrr': np.divide(1.0, first_ranks, out=np.zeros(len(queries)), where=first_ranks > 0),
+    }
+    recall_at_10 = hits_at(10) / count
+    total = metrics['p@10'] + recall_at_10
+    metrics['f1@10'] = np.divide(2 * metrics['p@10'] * recall_at_10, total, out=np.zeros(len(queries)), where=total > 0)
+
+    # Precisão interpolada nos níveis de recall 0, 0.1, ..., 1: maior precisão em um documento
+    # relevante com recall >= nível, localizado por busca binária em (consulta, recall)
+    interpolated = segment_suffix_max(precision, groups, len(queries))
+    keys = groups * 2.0 + hits / count[groups]
+    targets = np.arange(len(queries))[:, None] * 2.0 + RECALL_LEVELS[None, :] - 1e-12
+    positions = np.searchsorted(keys, targets)
+    reached = positions < group_ends[:, None]
+    eleven_points = np.zeros(targets.shape)
+    eleven_points[reached] = interpolated[positions[reached]]
+
+    # Consultas avaliadas: todas as que têm julgamentos de relevância. Uma consulta ausente dos
+    # resultados (sem documento recuperado, por exemplo com PROFUNDIDADE=k) tem zero em todas
+    # as métricas, em vez de ficar fora das médias
+    evaluated = np.unique(judged_queries)
+    evaluated_groups = np.searchsorted(queries, evaluated)
+    present = evaluated_groups < len(queries)
+    present[present] = queries[evaluated_groups[present]] == evaluated[present]
+
+    def per_evaluated(values):
+        expanded = np.zeros((len(evaluated),) + values.shape[1:])
+        expanded[present] = values[evaluated_groups[present]]
+        return expanded
+
+    return evaluated, {name: per_evaluated(values) for name, values in metrics.items()}, per_evaluated(eleven_points)
+
+def summarize(per_query, eleven_points):
+    summary = {name: float(values.mean()) if len(values) else 0.0 for name, values in per_query.items()}
+    summary['onze_pontos'] = eleven_points.mean(axis=0).tolist() if len(eleven_points) else [0.0] * len(RECALL_LEVELS)
+    return summary
+
+def evaluate_files(results_file, judgments_file):
+    evaluated, per_query, eleven_points = evaluate(*load_results(results_file), *load_judgments(judgments_file))
+    return evaluated, per_query, eleven_points, summarize(per_query, eleven_points)
+
+def write_report(summary, evaluated_count, stemmer_choice, output_file):
+    with open(output_file, 'w') as file:
+        file.write("# Avaliação do Sistema de Recuperação de Informação\n\n")
+        file.write(f"## Resultados com {stemmer_choice}\n")
+        file.write(f"- **Consultas Avaliadas:** {evaluated_count}\n")
+        file.write(f"- **F1 Score (@10):** {summary['f1@10']}\n")
+        file.write(f"- **Precision@5:** {summary['p@5']}\n")
+        file.write(f"- **Precision@10:** {summary['p@10']}\n")
+        file.write(f"- **R-Precision:** {summary['r_precision']}\n")
+        file.write(f"- **MAP:** {summary['map']}\n")
+        file.write(f"- **MRR:** {summary['mrr']}\n\n")
+        file.write("## Precisão Interpolada em 11 Pontos de Recall\n\n| Recall | Precisão |\n|---|---|\n")
+        for level, precision in zip(RECALL_LEVELS, summary['onze_pontos']):
+            file.write(f"| {level:.1f} | {precision} |\n")
+
+def write_eleven_points(summary, output_file):
+    with open(output_file, 'w') as file:
+        file.write('Recall,Precision\n')
+        for level, precision in zip(RECALL_LEVELS.tolist(), summary['onze_pontos']):
+            file.write(f'{level},{precision}\n')
+
+def write_query_metrics(evaluated, per_query, output_file):
+    # Métricas de cada consulta avaliada
+    names = list(per_query)
+    with open(output_file, 'w') as file:
+        file.write('QueryNumber;' + ';'.join(names) + '\n')
+        for i, query in enumerate(evaluated.tolist()):
+            file.write(f'{query};' + ';'.join(repr(float(per_query[name][i])) for name in names) + '\n')
+
+def plot_eleven_points(summary, output_file):
+    # matplotlib só é importado quando a curva é gerada
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.plot(RECALL_LEVELS, summary['onze_pontos'], marker='o')
+    plt.xlabel('Recall')
+    plt.ylabel('Precision')
+    plt.title('11-Point Precision-Recall Curve')
+    plt.savefig(output_file)
+    plt.close()
+
+def main_evaluation():
+    current_directory = os.getcwd()
+    results_file = os.path.join(current_directory, 'RESULT', 'RESULTADOS.csv')
+    judgments_file = os.path.join(current_directory, 'RESULT', 'expected_results.csv')
+    stemmer_choice = read_stemmer_choice(current_directory)
+
+    logging.info("\nAvaliando Resultados - Arquivo %s", results_file)
+    evaluated, per_query, eleven_points, summary = evaluate_files(results_file, judgments_file)
+    if not len(evaluated):
+        print("Não há dados suficientes para calcular métricas.")
+        return
+
+    output_dir = os.path.join(current_directory, 'AVALIA')
+    os.makedirs(output_dir, exist_ok=True)
+    write_report(summary, len(evaluated), stemmer_choice, os.path.join(output_dir, 'RELATORIO.MD'))
+    write_eleven_points(summary, os.path.join(output_dir, '11_pontos_precisao_recall.csv'))
+    plot_eleven_points(summary, os.path.join(output_dir, '11_pontos_precisao_recall.pdf'))
+    write_query_metrics(evaluated, per_query, os.path.join(output_dir, f'RESULTADOS-{stemmer_choice}.csv'))
+    logging.info("\n%s Consultas Avaliadas - MAP %.4f", len(evaluated), summary['map'])
+
+if __name__ == "__main__":
+    main_evaluation()
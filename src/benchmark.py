@@ -0,0 +1,524 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime
+import buscador
+import main
+from analisador import CACHE_SIZE, Analyzer, load_analyzer, load_stop_words, word_tokenize
+from avalia import evaluate_files
+from corpus_sintetico import generate_collection
+from indice_binario import open_binary_index, write_binary_index
+from indice_compacto import load_compact_index
+
+# Benchmarks de desempenho do sistema de recuperação.
+#
+# Uso: python src/benchmark.py paralelo [--processos N] [--repeticoes R] [arquivos XML ...]
+#      python src/benchmark.py etapas [--escala E] [--consultas Q] [--repeticoes R] [--saida ARQUIVO.json]
+#                                     [--comparar ANTERIOR.json]
+#      python src/benchmark.py fragmentos [--escala E] [--consultas Q] [--fragmentos N] [--profundidade K]
+#      python src/benchmark.py analisador [--escala E] [--repeticoes R] [arquivos XML ...]
+#      python src/benchmark.py partida [--escala E] [--repeticoes R]
+#      python src/benchmark.py posicional [--escala E] [--consultas Q] [--profundidade K]
+#      python src/benchmark.py memoria [--escala E] [--processos N]
+#
+# O modo etapas mede cada módulo do sistema (Processador de Consultas, Gerador Lista
+# Invertida, Indexador, Buscador e Avaliação) sobre uma coleção sintética no formato CF
+# (ver corpus_sintetico.py) ou sobre a coleção configurada, e grava tempos e pico de
+# memória em JSON para comparação entre versões. O modo fragmentos mede consultas por
+# segundo da busca no índice único e no índice fragmentado (fragmentos.py) com 1 a N fragmentos.
+# O modo analisador mede tokens por segundo da tokenização e do analisador (analisador.py).
+# O modo partida mede, em processos novos, o tempo até a primeira consulta respondida pelo
+# Buscador com o modelo lido dos CSVs e com o snapshot (instrução SNAPSHOT de busca.cfg).
+# O modo posicional compara a latência de consultas de frase e proximidade (posicional.py)
+# com a das mesmas consultas sem operadores. O modo memoria mede, em N processos do Buscador
+# simultâneos, o tempo de carga e a memória residente e privada acrescentadas pelo modelo
+# lido dos CSVs e pelo modelo anexado da memória compartilhada (memoria_compartilhada.py).
+STAGES = ('consultas', 'lista_invertida', 'indexador', 'busca', 'avaliacao')
+# Executado em um processo novo: importa o Buscador, carrega o modelo conforme a configuração
+# e responde uma consulta; imprime o tempo de cada fase
+COLD_START_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import buscador
+from analisador import Analyzer, load_stop_words
+imported = time.perf_counter()
+postings, document_norms, term_upper_bounds, term_rank = buscador.load_search_model(json.loads(sys.argv[2]), sys.argv[3])
+loaded = time.perf_counter()
+query = Analyzer(load_stop_words(sys.argv[4]), sys.argv[5] == 'STEMMER').terms(sys.argv[6])
+buscador.score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds, 10)
+answered = time.perf_counter()
+print(json.dumps({'importacao': imported - start_time, 'carga_modelo': loaded - imported, 'primeira_consulta': answered - loaded}))
+'''
+
+# Executado em N processos novos: carrega o modelo conforme a configuração, responde as
+# consultas e imprime o tempo de carga, a memória acrescentada (KB, de /proc no Linux) e um
+# resumo dos rankings
+SHARED_MEMORY_SCRIPT = '''
+import hashlib, json, sys, time
+sys.path.insert(0, sys.argv[1])
+import buscador
+
+def memory_kb():
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as file:
+            fields = {parts[0][:-1]: int(parts[1]) for parts in map(str.split, file) if parts[0].endswith(':')}
+    except OSError:
+        return 0, 0
+    return fields['Rss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+with open(sys.argv[4], 'r') as file:
+    queries = json.load(file)
+rss, private = memory_kb()
+start_time = time.perf_counter()
+postings, document_norms, term_upper_bounds, term_rank = buscador.load_search_model(json.loads(sys.argv[2]), sys.argv[3])
+loaded = time.perf_counter()
+results = [[(float(similarity), int(doc_id)) for similarity, doc_id in
+            buscador.score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds, 10)] for query in queries]
+rss_after, private_after = memory_kb()
+print(json.dumps({'carga_modelo': loaded - start_time, 'rss_kb': rss_after - rss, 'privada_kb': private_after - private,
+                  'rankings': hashlib.sha256(repr(results).encode()).hexdigest()}))
+'''
+
+def count_records(xml_files):
+    total = 0
+    for xml_file in xml_files:
+        for event, element in ET.iterparse(xml_file):
+            if element.tag == 'RECORD':
+                total += 1
+                element.clear()
+    return total
+
+def benchmark_parallel_indexing(xml_files, analyzer, max_workers, repeats=3):
+    # Escalabilidade do Gerador Lista Invertida de 1 a max_workers processos (melhor de repeats)
+    documents = count_records(xml_files)
+    results = []
+    for workers in range(1, max_workers + 1):
+        best = float('inf')
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            if workers > 1:
+                main.generate_inverted_list_parallel(xml_files, analyzer, workers)
+            else:
+                main.generate_inverted_list(main.iter_xml_records(xml_files, analyzer))
+            best = min(best, time.perf_counter() - start_time)
+        results.append({'processos': workers, 'segundos': best, 'documentos_por_segundo': documents / best,
+                        'speedup': results[0]['segundos'] / best if results else 1.0})
+    return results
+
+def stage_functions(query_file, xml_files, analyzer, work_dir, depth=0):
+    # Uma função por módulo, com as mesmas entradas e saídas em arquivo de main()
+    paths = {name: os.path.join(work_dir, name) for name in
+             ('processed_queries.csv', 'expected_results.csv', 'inverted_list.csv', 'vector_model.csv',
+              'document_norms.csv', 'RESULTADOS.csv')}
+
+    def queries_stage():
+        main.process_queries(query_file, paths['processed_queries.csv'], paths['expected_results.csv'])
+
+    def inverted_list_stage():
+        inverted_list = main.generate_inverted_list(main.iter_xml_records(xml_files, analyzer))
+        main.write_inverted_list_to_csv(inverted_list, paths['inverted_list.csv'])
+
+    def indexer_stage():
+        vector_model_index = main.process_inverted_list(main.load_inverted_list(paths['inverted_list.csv']))
+        document_norms = main.compute_document_norms(vector_model_index)
+        term_upper_bounds = buscador.compute_term_upper_bounds(
+            {term: document_data.items() for term, (idf, document_data) in vector_model_index.items()}, document_norms)
+        main.write_vector_model(vector_model_index, paths['vector_model.csv'], term_upper_bounds)
+        main.write_document_norms(document_norms, paths['document_norms.csv'])
+
+    def search_stage():
+        index = load_compact_index(paths['vector_model.csv'], paths['document_norms.csv'])
+        queries = buscador.load_queries(paths['processed_queries.csv'], analyzer)
+        search_results = buscador.perform_search(index.postings, index.document_norms, queries, depth,
+                                             index.term_upper_bounds, index.term_rank)
+        main.write_search_results(search_results, paths['RESULTADOS.csv'])
+
+    def evaluation_stage():
+        evaluated, per_query, eleven_points, summary = evaluate_files(paths['RESULTADOS.csv'], paths['expected_results.csv'])
+        return summary
+
+    return dict(zip(STAGES, (queries_stage, inverted_list_stage, indexer_stage, search_stage, evaluation_stage)))
+
+def benchmark_stages(query_file, xml_files, analyzer, work_dir, repeats=3, depth=0):
+    # Cada repetição executa as etapas em sequência (cada uma lê as saídas da anterior).
+    # O pico de memória vem de uma execução adicional sob tracemalloc, fora das medidas de tempo.
+    stages = stage_functions(query_file, xml_files, analyzer, work_dir, depth)
+    timings = {name: [] for name in STAGES}
+    metrics = None
+    for _ in range(repeats):
+        for name, stage in stages.items():
+            start_time = time.perf_counter()
+            output = stage()
+            timings[name].append(time.perf_counter() - start_time)
+            if name == 'avaliacao':
+                metrics = output
+
+    results = {}
+    for name, stage in stages.items():
+        tracemalloc.start()
+        stage()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {'segundos': timings[name], 'minimo': min(timings[name]),
+                         'mediana': statistics.median(timings[name]), 'pico_memoria_kb': peak / 1024}
+    return results, metrics
+
+def benchmark_sharded_search(query_file, xml_files, analyzer, work_dir, max_shards, depth=10, repeats=3):
+    # Consultas por segundo do índice único (perform_search) e do índice com 1 a max_shards fragmentos
+    from fragmentos import open_sharded_search, write_shards
+    processed_queries = os.path.join(work_dir, 'processed_queries.csv')
+    main.process_queries(query_file, processed_queries, os.path.join(work_dir, 'expected_results.csv'))
+    queries = buscador.load_queries(processed_queries, analyzer)
+    vector_model_index = main.process_inverted_list(main.generate_inverted_list(main.iter_xml_records(xml_files, analyzer)))
+    document_norms = main.compute_document_norms(vector_model_index)
+    term_upper_bounds = buscador.compute_term_upper_bounds(
+        {term: document_data.items() for term, (idf, document_data) in vector_model_index.items()}, document_norms)
+    index_file = os.path.join(work_dir, 'vector_model.bin')
+    write_binary_index(vector_model_index, document_norms, term_upper_bounds, index_file)
+
+    index = open_binary_index(index_file)
+    best = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        expected = buscador.perform_search(index.postings, index.document_norms, queries, depth,
+                                       index.term_upper_bounds, index.term_rank)
+        best = min(best, time.perf_counter() - start_time)
+    results = [{'fragmentos': 0, 'segundos': best, 'consultas_por_segundo': len(queries) / best, 'speedup': 1.0,
+                'rankings_iguais': True}]
+
+    for shard_count in range(1, max_shards + 1):
+        write_shards(vector_model_index, document_norms, index_file, shard_count)
+        with open_sharded_search(index_file, shard_count) as sharded_search:
+            # Primeira busca fora da medida: inicia os processos e mapeia os fragmentos
+            search_results = sharded_search.search(queries, depth)
+            best = float('inf')
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                sharded_search.search(queries, depth)
+                best = min(best, time.perf_counter() - start_time)
+        results.append({'fragmentos': shard_count, 'segundos': best, 'consultas_por_segundo': len(queries) / best,
+                        'speedup': results[0]['segundos'] / best, 'rankings_iguais': search_results == expected})
+    return results
+
+def benchmark_analyzer(xml_files, stop_words, repeats=3):
+    # Tokens por segundo sobre os textos já lidos: apenas word_tokenize (limite inferior do custo)
+    # e o analisador sem e com stemming, com o cache de termos e sem ele (cache_size=0)
+    texts = [text for record_num, text in main.iter_xml_texts(xml_files)]
+    tokens = sum(len(word_tokenize(text)) for text in texts)
+    variants = [('word_tokenize', lambda: word_tokenize)]
+    for stemming in (False, True):
+        for cache_size in (0, CACHE_SIZE):
+            name = f"{'STEMMER' if stemming else 'NOSTEMMER'} {'com cache' if cache_size else 'sem cache'}"
+            variants.append((name, lambda stemming=stemming, cache_size=cache_size:
+                             Analyzer(stop_words, stemming, cache_size).terms))
+    results = []
+    for name, build in variants:
+        best = float('inf')
+        for _ in range(repeats):
+            # Analisador novo a cada repetição: o cache começa vazio
+            analyze = build()
+            start_time = time.perf_counter()
+            for text in texts:
+                analyze(text)
+            best = min(best, time.perf_counter() - start_time)
+        results.append({'variante': name, 'segundos': best, 'tokens_por_segundo': tokens / best})
+    return tokens, results
+
+def benchmark_cold_start(query_file, xml_files, analyzer, work_dir, stop_words_file, repeats=3):
+    # Tempo de parede de um processo novo até a primeira consulta respondida (melhor de repeats),
+    # com o modelo vetorial lido dos CSVs e aberto do snapshot
+    stages = stage_functions(query_file, xml_files, analyzer, work_dir)
+    for name in ('consultas', 'lista_invertida', 'indexador'):
+        stages[name]()
+    with open(os.path.join(work_dir, 'processed_queries.csv'), 'r') as file:
+        next(file)
+        query_text = next(file).split(';', 1)[1].strip().strip('"')
+
+    search_configs = {'csv': {'MODELO': 'vector_model.csv', 'NORMAS': 'document_norms.csv'},
+                      'snapshot': {'MODELO': 'vector_model.csv', 'NORMAS': 'document_norms.csv', 'SNAPSHOT': 'snapshot.bin'}}
+    # O primeiro processo com SNAPSHOT grava o snapshot; os medidos apenas o abrem
+    buscador.load_search_model(search_configs['snapshot'], work_dir)
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for name, search_config in search_configs.items():
+        best = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, source_dir, json.dumps(search_config), work_dir,
+                                     stop_words_file, 'STEMMER' if analyzer.stemming else 'NOSTEMMER', query_text],
+                                    capture_output=True, text=True, check=True).stdout
+            elapsed = time.perf_counter() - start_time
+            if best is None or elapsed < best['segundos']:
+                best = {'modelo': name, 'segundos': elapsed, **json.loads(output.splitlines()[-1])}
+        results.append(best)
+    return results
+
+def benchmark_positional(xml_files, analyzer, work_dir, queries=200, depth=10, seed=0):
+    # Latência média por consulta (ms): cada consulta tem uma frase de 2 ou 3 termos sorteada de
+    # um documento mais 2 termos avulsos, e é executada sem operadores, como frase, como
+    # proximidade e com bônus de proximidade. A primeira passada começa com o cache de postings
+    # posicionais vazio; a segunda reaproveita os postings já decodificados.
+    import random
+    from posicional import PositionalIndexBuilder, PositionalQuery, PositionalSearch, open_positional_index
+    builder = PositionalIndexBuilder()
+    records = dict(builder.observe(main.iter_xml_records(xml_files, analyzer)))
+    index_file = os.path.join(work_dir, 'posicoes.bin')
+    builder.write(index_file)
+    vector_model_index = main.process_inverted_list(main.generate_inverted_list(records))
+    document_norms = main.compute_document_norms(vector_model_index)
+    term_upper_bounds = buscador.compute_term_upper_bounds(
+        {term: document_data.items() for term, (idf, document_data) in vector_model_index.items()}, document_norms)
+    postings, document_norms, term_upper_bounds, term_rank = buscador.search_model_from_vector_model(
+        vector_model_index, document_norms, term_upper_bounds)
+
+    rng = random.Random(seed)
+    documents = [terms for terms in records.values() if len(terms) >= 3]
+    workload = []
+    for _ in range(queries):
+        terms = rng.choice(documents)
+        length = rng.choice((2, 3))
+        start = rng.randrange(len(terms) - length + 1)
+        phrase = tuple(terms[start:start + length])
+        workload.append((list(phrase) + [rng.choice(terms) for _ in range(2)], phrase))
+
+    variants = [('sem operadores', 0.0, None), ('frase', 0.0, 'frase'), ('proximidade ~5', 0.0, 5),
+                ('bônus de proximidade', 0.5, None)]
+    results = []
+    for name, boost, operator in variants:
+        search = PositionalSearch(open_positional_index(index_file), boost)
+        passes = []
+        for _ in range(2):
+            start_time = time.perf_counter()
+            for terms, phrase in workload:
+                if operator is None:
+                    query = PositionalQuery(terms)
+                else:
+                    query = PositionalQuery(terms, [(phrase, None if operator == 'frase' else operator)])
+                search.search(postings, document_norms, query, term_rank, term_upper_bounds, depth)
+            passes.append((time.perf_counter() - start_time) / len(workload) * 1000)
+        results.append({'variante': name, 'primeira_ms': passes[0], 'segunda_ms': passes[1]})
+    for result in results:
+        result['razao'] = result['segunda_ms'] / results[0]['segunda_ms']
+    return results
+
+def benchmark_shared_memory(query_file, xml_files, analyzer, work_dir, workers=4):
+    # N processos do Buscador simultâneos, cada um com o modelo lido dos CSVs ou anexado do
+    # segmento publicado por este processo; médias por processo e memória privada total
+    from memoria_compartilhada import encode_search_model, publish_index, source_files, source_fingerprint
+    stages = stage_functions(query_file, xml_files, analyzer, work_dir)
+    for name in ('consultas', 'lista_invertida', 'indexador'):
+        stages[name]()
+    queries_file = os.path.join(work_dir, 'queries.json')
+    with open(queries_file, 'w') as file:
+        json.dump(list(buscador.load_queries(os.path.join(work_dir, 'processed_queries.csv'), analyzer).values()), file)
+
+    csv_config = {'MODELO': 'vector_model.csv', 'NORMAS': 'document_norms.csv'}
+    segment_name = f'rivec_benchmark_{os.getpid()}'
+    shared_memory = publish_index(encode_search_model(csv_config, work_dir), segment_name,
+                                  source_fingerprint(source_files(csv_config, work_dir)))
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    try:
+        for name, search_config in (('csv', csv_config),
+                                    ('memoria compartilhada', {**csv_config, 'MEMORIA_COMPARTILHADA': segment_name})):
+            processes = [subprocess.Popen([sys.executable, '-c', SHARED_MEMORY_SCRIPT, source_dir, json.dumps(search_config),
+                                           work_dir, queries_file], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                          text=True) for _ in range(workers)]
+            measurements = [json.loads(process.communicate()[0].splitlines()[-1]) for process in processes]
+            results.append({'modelo': name, 'processos': workers,
+                            'carga_ms': statistics.mean(m['carga_modelo'] for m in measurements) * 1000,
+                            'rss_kb': statistics.mean(m['rss_kb'] for m in measurements),
+                            'privada_kb': statistics.mean(m['privada_kb'] for m in measurements),
+                            'privada_total_kb': sum(m['privada_kb'] for m in measurements),
+                            'rankings': {m['rankings'] for m in measurements}})
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+    expected = results[0]['rankings']
+    for result in results:
+        result['rankings_iguais'] = result.pop('rankings') == expected
+    return shared_memory.size, results
+
+def config_path(current_directory, path):
+    # Caminhos dos arquivos .cfg usam '\\' como separador
+    return os.path.join(current_directory, *path.split('\\'))
+
+def configured_xml_files(current_directory):
+    inverted_list_config = main.read_inverted_list_config(os.path.join(current_directory, 'src', 'gli.cfg'))
+    return [config_path(current_directory, file) for file in inverted_list_config['LEIA'].split(', ')]
+
+def source_version():
+    # Commit corrente, para identificar o relatório; None fora de um repositório git
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_reports(previous, current):
+    # Razão entre o tempo mínimo (e o pico de memória) atual e o do relatório anterior
+    rows = []
+    for name in STAGES:
+        if name in previous['etapas'] and name in current['etapas']:
+            before, after = previous['etapas'][name], current['etapas'][name]
+            rows.append((name, before['minimo'], after['minimo'], after['minimo'] / before['minimo'],
+                         after['pico_memoria_kb'] / before['pico_memoria_kb']))
+    return rows
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description='Benchmarks do sistema de recuperação')
+    subparsers = parser.add_subparsers(dest='modo', required=True)
+
+    parallel_parser = subparsers.add_parser('paralelo', help='escalabilidade do Gerador Lista Invertida paralelo')
+    parallel_parser.add_argument('arquivos', nargs='*', help='arquivos XML (padrão: instrução LEIA de gli.cfg)')
+    parallel_parser.add_argument('--processos', type=int, default=os.cpu_count(), help='número máximo de processos')
+    parallel_parser.add_argument('--repeticoes', type=int, default=3)
+
+    stages_parser = subparsers.add_parser('etapas', help='tempo e pico de memória de cada módulo')
+    stages_parser.add_argument('--escala', type=float, default=1.0,
+                               help='tamanho da coleção sintética relativo à coleção CF; 0 usa a coleção configurada')
+    stages_parser.add_argument('--consultas', type=int, default=100, help='número de consultas sintéticas')
+    stages_parser.add_argument('--semente', type=int, default=0)
+    stages_parser.add_argument('--repeticoes', type=int, default=3)
+    stages_parser.add_argument('--profundidade', type=int, default=0, help='profundidade do ranking (0 = completo)')
+    stages_parser.add_argument('--saida', default='benchmark.json', help='relatório JSON')
+    stages_parser.add_argument('--comparar', help='relatório JSON anterior para comparação')
+
+    shards_parser = subparsers.add_parser('fragmentos', help='consultas por segundo do índice fragmentado')
+    shards_parser.add_argument('--escala', type=float, default=4.0, help='tamanho da coleção sintética relativo à coleção CF')
+    shards_parser.add_argument('--consultas', type=int, default=1000, help='número de consultas sintéticas')
+    shards_parser.add_argument('--semente', type=int, default=0)
+    shards_parser.add_argument('--fragmentos', type=int, default=os.cpu_count(), help='número máximo de fragmentos')
+    shards_parser.add_argument('--profundidade', type=int, default=10, help='profundidade do ranking (0 = completo)')
+    shards_parser.add_argument('--repeticoes', type=int, default=3)
+
+    analyzer_parser = subparsers.add_parser('analisador', help='tokens por segundo do analisador')
+    analyzer_parser.add_argument('arquivos', nargs='*', help='arquivos XML (padrão: coleção sintética)')
+    analyzer_parser.add_argument('--escala', type=float, default=1.0, help='tamanho da coleção sintética relativo à coleção CF')
+    analyzer_parser.add_argument('--repeticoes', type=int, default=3)
+
+    cold_start_parser = subparsers.add_parser('partida', help='tempo até a primeira consulta em um processo novo')
+    cold_start_parser.add_argument('--escala', type=float, default=1.0, help='tamanho da coleção sintética relativo à coleção CF')
+    cold_start_parser.add_argument('--repeticoes', type=int, default=3)
+
+    positional_parser = subparsers.add_parser('posicional', help='latência de consultas de frase e proximidade')
+    positional_parser.add_argument('--escala', type=float, default=0.0,
+                                   help='tamanho da coleção sintética relativo à coleção CF; 0 usa a coleção configurada')
+    positional_parser.add_argument('--consultas', type=int, default=200)
+    positional_parser.add_argument('--profundidade', type=int, default=10)
+
+    shared_memory_parser = subparsers.add_parser('memoria', help='memória de N processos do Buscador com o modelo compartilhado')
+    shared_memory_parser.add_argument('--escala', type=float, default=1.0, help='tamanho da coleção sintética relativo à coleção CF')
+    shared_memory_parser.add_argument('--processos', type=int, default=4, help='número de processos do Buscador')
+    args = parser.parse_args()
+
+    current_directory = os.getcwd()
+    stop_words = load_stop_words(os.path.join(current_directory, 'stopwords.txt'))
+    analyzer = load_analyzer(current_directory, stop_words)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.modo == 'paralelo':
+        xml_files = args.arquivos or configured_xml_files(current_directory)
+        print('Processos;Segundos;Documentos/s;Speedup')
+        for result in benchmark_parallel_indexing(xml_files, analyzer, args.processos, args.repeticoes):
+            print(f"{result['processos']};{result['segundos']:.3f};{result['documentos_por_segundo']:.1f};{result['speedup']:.2f}")
+        return
+
+    if args.modo == 'analisador':
+        with tempfile.TemporaryDirectory() as work_dir:
+            xml_files = args.arquivos or generate_collection(os.path.join(work_dir, 'data'), args.escala, 1)[0]
+            tokens, results = benchmark_analyzer(xml_files, stop_words, args.repeticoes)
+        print(f'{tokens} Tokens')
+        print('Variante;Segundos;Tokens/s')
+        for result in results:
+            print(f"{result['variante']};{result['segundos']:.3f};{result['tokens_por_segundo']:.0f}")
+        return
+
+    if args.modo == 'partida':
+        with tempfile.TemporaryDirectory() as work_dir:
+            xml_files, query_file = generate_collection(os.path.join(work_dir, 'data'), args.escala, 10)
+            results = benchmark_cold_start(query_file, xml_files, analyzer, work_dir,
+                                           os.path.join(current_directory, 'stopwords.txt'), args.repeticoes)
+        print('Modelo;Total (s);Importação (s);Carga do Modelo (s);Primeira Consulta (s)')
+        for result in results:
+            print(f"{result['modelo']};{result['segundos']:.3f};{result['importacao']:.3f};{result['carga_modelo']:.3f};"
+                  f"{result['primeira_consulta']:.3f}")
+        return
+
+    if args.modo == 'posicional':
+        with tempfile.TemporaryDirectory() as work_dir:
+            if args.escala > 0:
+                xml_files = generate_collection(os.path.join(work_dir, 'data'), args.escala, 1)[0]
+            else:
+                xml_files = configured_xml_files(current_directory)
+            results = benchmark_positional(xml_files, analyzer, work_dir, args.consultas, args.profundidade)
+        print('Variante;Primeira Passada (ms/consulta);Segunda Passada (ms/consulta);Razão')
+        for result in results:
+            print(f"{result['variante']};{result['primeira_ms']:.3f};{result['segunda_ms']:.3f};{result['razao']:.2f}")
+        return
+
+    if args.modo == 'memoria':
+        with tempfile.TemporaryDirectory() as work_dir:
+            xml_files, query_file = generate_collection(os.path.join(work_dir, 'data'), args.escala, 100)
+            segment_size, results = benchmark_shared_memory(query_file, xml_files, analyzer, work_dir, args.processos)
+        print(f'Segmento: {segment_size / 1024:.0f} KB')
+        print('Modelo;Processos;Carga (ms);RSS por Processo (KB);Privada por Processo (KB);Privada Total (KB);Rankings Iguais')
+        for result in results:
+            print(f"{result['modelo']};{result['processos']};{result['carga_ms']:.2f};{result['rss_kb']:.0f};"
+                  f"{result['privada_kb']:.0f};{result['privada_total_kb']:.0f};{'SIM' if result['rankings_iguais'] else 'NAO'}")
+        return
+
+    if args.modo == 'fragmentos':
+        with tempfile.TemporaryDirectory() as work_dir:
+            xml_files, query_file = generate_collection(os.path.join(work_dir, 'data'), args.escala, args.consultas,
+                                                        seed=args.semente)
+            results = benchmark_sharded_search(query_file, xml_files, analyzer, work_dir, args.fragmentos,
+                                               args.profundidade, args.repeticoes)
+        print('Fragmentos;Segundos;Consultas/s;Speedup;Rankings Iguais')
+        for result in results:
+            print(f"{result['fragmentos'] or 'único'};{result['segundos']:.3f};{result['consultas_por_segundo']:.1f};"
+                  f"{result['speedup']:.2f};{'SIM' if result['rankings_iguais'] else 'NAO'}")
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.escala > 0:
+            xml_files, query_file = generate_collection(os.path.join(work_dir, 'data'), args.escala, args.consultas,
+                                                        seed=args.semente)
+            collection = {'escala': args.escala, 'consultas': args.consultas, 'semente': args.semente}
+        else:
+            xml_files = configured_xml_files(current_directory)
+            query_config = buscador.read_configuration_file(os.path.join(current_directory, 'src', 'pc.cfg'))
+            query_file = config_path(current_directory, 'data\\' + query_config['LEIA'])
+            collection = {'arquivos': xml_files + [query_file]}
+        collection['documentos'] = count_records(xml_files)
+        stages, metrics = benchmark_stages(query_file, xml_files, analyzer, work_dir, args.repeticoes, args.profundidade)
+
+    report = {'versao': source_version(), 'data': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'colecao': collection, 'repeticoes': args.repeticoes,
+              'profundidade': args.profundidade, 'etapas': stages, 'metricas': metrics}
+    with open(args.saida, 'w') as file:
+        json.dump(report, file, indent=1)
+
+    print('Etapa;Mínimo (s);Mediana (s);Pico de Memória (KB)')
+    for name, result in stages.items():
+        print(f"{name};{result['minimo']:.4f};{result['mediana']:.4f};{result['pico_memoria_kb']:.0f}")
+    if args.comparar:
+        with open(args.comparar, 'r') as file:
+            previous = json.load(file)
+        print(f"\nComparação com {previous.get('versao')} ({args.comparar})")
+        print('Etapa;Antes (s);Depois (s);Razão Tempo;Razão Memória')
+        for name, before, after, time_ratio, memory_ratio in compare_reports(previous, report):
+            print(f"{name};{before:.4f};{after:.4f};{time_ratio:.2f};{memory_ratio:.2f}")
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,94 @@
+import logging
+from math import sqrt
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+# Busca em lote: todas as consultas são pontuadas por um único produto de matrizes
+# esparsas. O modelo vetorial é mantido como matriz CSR documento x termo com as linhas
+# já divididas pela norma do documento, e cada consulta é uma linha com peso
+# 1 / sqrt(len(consulta)) em cada termo distinto, de modo que o produto é o cosseno
+# de score_query.
+
+class DocumentMatrix:
+    __slots__ = ('matrix', 'term_ids', 'documents', 'zero_norm_documents')
+
+    def __init__(self, matrix, term_ids, documents, zero_norm_documents):
+        self.matrix = matrix
+        self.term_ids = term_ids
+        self.documents = documents
+        self.zero_norm_documents = zero_norm_documents
+
+def build_document_matrix(postings, document_norms):
+    # Linhas indexadas pelo próprio DocID; colunas na ordem dos termos do modelo vetorial
+    documents = sorted(document_norms)
+    norms = np.zeros(documents[-1] + 1 if documents else 0)
+    for doc_id in documents:
+        norms[doc_id] = document_norms[doc_id]
+
+    term_ids = {}
+    rows = []
+    weights = []
+    columns = []
+    for term_id, (word, posting) in enumerate(postings.items()):
+        term_ids[word] = term_id
+        doc_ids, term_weights = posting.decode() if hasattr(posting, 'decode') else posting
+        rows.append(np.asarray(doc_ids, dtype=np.int64))
+        weights.append(np.asarray(term_weights, dtype=np.float64))
+        columns.append(np.full(len(doc_ids), term_id, dtype=np.int64))
+
+    matrix = csr_matrix((np.concatenate(weights) if weights else np.zeros(0),
+                         (np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+                          np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64))),
+                        shape=(len(norms), len(term_ids)))
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    matrix = (diags(inverse_norms) @ matrix).tocsr()
+    zero_norm_documents = {doc_id for doc_id in documents if document_norms[doc_id] == 0}
+    return DocumentMatrix(matrix, term_ids, documents, zero_norm_documents)
+
+def build_query_matrix(queries, term_ids):
+    rows = []
+    columns = []
+    values = []
+    for row, query in enumerate(queries.values()):
+        query_terms = {term_ids[word] for word in query if word in term_ids}
+        for term_id in query_terms:
+            rows.append(row)
+            columns.append(term_id)
+            values.append(1 / sqrt(len(query)))
+    return csr_matrix((values, (rows, columns)), shape=(len(queries), len(term_ids)))
+
+def top_k_row(scores, doc_ids, depth):
+    # Ranking de uma linha por (similaridade, DocID) decrescentes, como perform_search
+    positive = scores > 0
+    scores, doc_ids = scores[positive], doc_ids[positive]
+    if 0 < depth < len(scores):
+        # argpartition seleciona os k maiores; empates com o k-ésimo escore são mantidos
+        # para que o desempate por DocID seja feito na ordenação
+        kth = scores[np.argpartition(-scores, depth - 1)[depth - 1]]
+        keep = scores >= kth
+        scores, doc_ids = scores[keep], doc_ids[keep]
+    order = np.lexsort((-doc_ids, -scores))
+    if depth > 0:
+        order = order[:depth]
+    return list(zip(scores[order].tolist(), doc_ids[order].tolist()))
+
+def batch_search(document_matrix, queries, depth=0):
+    logging.info("\nRealizando a Busca em Lote - Produto de Matrizes Esparsas")
+    query_matrix = build_query_matrix(queries, document_matrix.term_ids)
+    scores = (query_matrix @ document_matrix.matrix.T).tocsr()
+
+    documents_desc = document_matrix.documents[::-1]
+    search_results = []
+    for row, (query_number, query) in enumerate(queries.items()):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        query_results = top_k_row(scores.data[start:end], scores.indices[start:end].astype(np.int64), depth)
+        if depth <= 0:
+            # Ranking completo: documentos sem termo em comum ao final com similaridade zero
+            matched = {doc_id for similarity, doc_id in query_results}
+            query_empty = len(query) == 0
+            for doc_id in documents_desc:
+                if doc_id not in matched:
+                    zero = 0 if query_empty or doc_id in document_matrix.zero_norm_documents else 0.0
+                    query_results.append((zero, doc_id))
+        search_results.append((query_number, query_results))
+    return search_results
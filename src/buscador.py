@@ -0,0 +1,315 @@
+import heapq
+import logging
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from math import sqrt
+from compressao import END_OF_POSTINGS
+from indice_binario import open_binary_index, write_binary_index
+from indice_compacto import load_compact_index
+
+# Buscador segundo o modelo vetorial: leitura das configurações, das consultas e do modelo
+# (memória compartilhada, índice binário, snapshot ou CSVs) e cálculo dos rankings pelo
+# cosseno, completos (term-at-a-time) ou top-k (MaxScore).
+#
+# main.py, o servidor de busca e os módulos do índice posicional, dos fragmentos e da
+# memória compartilhada importam este módulo, e nunca o script main.py: executado como
+# python src/main.py, main é o módulo __main__ e uma importação de main carregaria uma
+# segunda cópia, com funções diferentes das instrumentadas (instrumentacao.py).
+
+def read_configuration_file(file_path):
+    instructions = {}
+    with open(file_path, 'r') as file:
+        for line in file:
+            key, value = line.strip().split('=')
+            instructions[key.strip()] = value.strip()
+    return instructions
+
+def compute_term_upper_bounds(term_weights, document_norms):
+    # Maior contribuição possível de cada termo para o cosseno (peso / norma do documento).
+    # term_weights associa cada termo a pares (documento, peso).
+    upper_bounds = {}
+    for term, document_weights in term_weights.items():
+        upper_bounds[term] = max((weight / document_norms[document] for document, weight in document_weights
+                                  if document_norms[document]), default=0.0)
+    return upper_bounds
+
+def load_queries(file_path, analyzer):
+    logging.info("\nCarregando Consultas (Queries) - Leitura CSV")
+    queries = defaultdict(list)
+    with open(file_path, 'r') as file:
+        # Ler linhas do arquivo
+        lines = file.readlines()
+        
+        # Iterar sobre as linhas para extrair as consultas
+        i = 1  # Começar a partir da segunda linha, ignorando o cabeçalho
+        while i < len(lines):
+            line = lines[i].strip()  
+            if line:  # Verificar se a linha não está vazia
+                # Verificar se a próxima linha começa com espaços em branco, indicando uma continuação
+                while i + 1 < len(lines) and lines[i + 1].startswith(' '):
+                    # Adicionar a linha atual à próxima linha e remover espaços em branco no início
+                    line += lines[i + 1].lstrip()
+                    i += 1  
+                    
+                # Dividir a linha em duas partes no primeiro ponto e vírgula encontrado
+                parts = line.split(';', 1)
+                
+                # Verificar se a linha foi dividida corretamente
+                if len(parts) == 2:
+                    query_number = int(parts[0].strip())  # Extrair o número da consulta e remover espaços em branco
+                    # Remove apenas as aspas que delimitam o campo: aspas internas marcam frases (posicional.py)
+                    query_text = parts[1].strip()
+                    if len(query_text) > 1 and query_text[0] == query_text[-1] == '"':
+                        query_text = query_text[1:-1]
+                    query_text = analyzer.terms(query_text)  # Extrair os termos da consulta com o analisador dos documentos
+                    
+                    # Adicionar as palavras da consulta à lista de consultas correspondente ao número
+                    queries[query_number] = query_text
+                else:
+                    print(f"Erro na linha: {line}")
+            i += 1  
+    return queries
+
+def posting_arrays(posting):
+    # (doc_ids, pesos) de uma lista de postings em qualquer uma das representações
+    if hasattr(posting, 'decode'):
+        # Postings comprimidos: decodifica só as listas percorridas
+        return posting.decode()
+    doc_ids, weights = posting
+    if hasattr(doc_ids, 'tolist'):
+        # Visões NumPy do índice binário: converte só os postings percorridos
+        return doc_ids.tolist(), weights.tolist()
+    return doc_ids, weights
+
+def zero_similarity_results(document_norms):
+    # Similaridade zero de cada documento em ordem decrescente de DocID, como no ranking
+    # completo original (0 inteiro para documentos de norma zero): o final de todo ranking
+    # completo, calculado uma vez por modelo
+    return [(0 if document_norms[doc_id] == 0 else 0.0, doc_id) for doc_id in sorted(document_norms, reverse=True)]
+
+def score_query(postings, document_norms, query, term_rank, zero_similarities):
+    query_magnitude = sqrt(len(query))  # Considerando o tamanho da lista como magnitude
+
+    # Term-at-a-time: percorre apenas os postings dos termos da consulta, acumulando
+    # o produto escalar por documento. Os termos seguem a ordem do modelo vetorial,
+    # a mesma em que o cálculo documento a documento original somava os pesos.
+    query_terms = sorted((word for word in set(query) if word in postings), key=term_rank.get)
+    accumulators = {}
+    for word in query_terms:
+        doc_ids, weights = posting_arrays(postings[word])
+        for doc_id, weight in zip(doc_ids, weights):
+            accumulators[doc_id] = accumulators.get(doc_id, 0) + weight
+
+    query_results = []
+    for doc_id, dot_product in accumulators.items():
+        doc_magnitude = document_norms[doc_id]
+        if dot_product and doc_magnitude:
+            query_results.append((dot_product / (query_magnitude * doc_magnitude), doc_id))
+    query_results.sort(reverse=True)
+
+    # Documentos sem termo em comum com a consulta ficam ao final com similaridade zero
+    matched = {doc_id for similarity, doc_id in query_results}
+    for zero, doc_id in zero_similarities:
+        if doc_id not in matched:
+            query_results.append((0 if query_magnitude == 0 else zero, doc_id))
+    return query_results
+
+# Folga relativa aplicada aos limites superiores, para que arredondamentos de ponto
+# flutuante nunca descartem um documento que entraria no top-k
+UPPER_BOUND_SLACK = 1 + 1e-9
+
+class PostingCursor:
+    __slots__ = ('rank', 'doc_ids', 'weights', 'position', 'doc')
+
+    def __init__(self, rank, doc_ids, weights):
+        self.rank = rank
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.position = 0
+        self.doc = doc_ids[0] if len(doc_ids) else END_OF_POSTINGS
+
+    def weight(self):
+        return self.weights[self.position]
+
+    def next(self):
+        self.position += 1
+        self.doc = self.doc_ids[self.position] if self.position < len(self.doc_ids) else END_OF_POSTINGS
+
+    def seek(self, target):
+        # Avança até o primeiro documento >= target
+        if self.doc < target:
+            self.position = bisect_left(self.doc_ids, target, self.position)
+            self.doc = self.doc_ids[self.position] if self.position < len(self.doc_ids) else END_OF_POSTINGS
+
+def posting_cursor(rank, posting):
+    # Postings comprimidos fornecem o próprio cursor, que salta blocos inteiros
+    if hasattr(posting, 'cursor'):
+        return posting.cursor(rank)
+    return PostingCursor(rank, *posting)
+
+def score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds, depth):
+    query_magnitude = sqrt(len(query))
+    query_terms = [word for word in set(query) if word in postings]
+    if not query_terms:
+        return []
+
+    # MaxScore: cursores ordenados pelo limite superior crescente. Os primeiros termos,
+    # cuja soma de limites não alcança o menor escore do heap, são "não essenciais":
+    # um documento que só aparece neles não pode entrar no top-k.
+    query_terms.sort(key=lambda word: term_upper_bounds[word])
+    cursors = [posting_cursor(term_rank[word], postings[word]) for word in query_terms]
+    prefix_bounds = []
+    total = 0.0
+    for word in query_terms:
+        total += term_upper_bounds[word]
+        prefix_bounds.append(total * UPPER_BOUND_SLACK / query_magnitude)
+
+    heap = []
+    first_essential = 0
+    essential = cursors
+    while essential:
+        candidate = min(cursor.doc for cursor in essential)
+        if candidate == END_OF_POSTINGS:
+            break
+
+        contributions = []
+        partial = 0.0
+        for cursor in essential:
+            if cursor.doc == candidate:
+                weight = cursor.weight()
+                contributions.append((cursor.rank, weight))
+                partial += weight
+                cursor.next()
+
+        doc_magnitude = document_norms[candidate]
+        if not doc_magnitude:
+            continue
+
+        # Completa o escore com os termos não essenciais, do maior limite para o menor,
+        # abandonando o documento assim que o limite não supera o menor escore do heap
+        for i in range(first_essential - 1, -1, -1):
+            if partial * UPPER_BOUND_SLACK / (query_magnitude * doc_magnitude) + prefix_bounds[i] < heap[0][0]:
+                break
+            cursor = cursors[i]
+            cursor.seek(candidate)
+            if cursor.doc == candidate:
+                weight = cursor.weight()
+                contributions.append((cursor.rank, weight))
+                partial += weight
+        else:
+            # Soma na ordem do modelo vetorial, como em score_query
+            dot_product = 0
+            for rank, weight in sorted(contributions):
+                dot_product += weight
+            if not dot_product:
+                continue
+            entry = (dot_product / (query_magnitude * doc_magnitude), candidate)
+            if len(heap) < depth:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                continue
+
+            if len(heap) == depth:
+                while first_essential < len(cursors) and prefix_bounds[first_essential] < heap[0][0]:
+                    first_essential += 1
+                essential = cursors[first_essential:]
+
+    return sorted(heap, reverse=True)
+
+def perform_search(postings, document_norms, queries, depth=0, term_upper_bounds=None, term_rank=None, cache=None,
+                   positional=None):
+    logging.info("\nRealizando a Busca - Resposta Encontrada p/ Consulta")
+    if term_rank is None:
+        term_rank = {word: rank for rank, word in enumerate(postings)}
+    zero_similarities = None
+    if depth <= 0:
+        zero_similarities = zero_similarity_results(document_norms)
+    # Os resultados levam o número de cada consulta (QueryNumber), que a avaliação une aos
+    # julgamentos de relevância
+    search_results = []
+    for query_number, query in queries.items():
+        query_results = cache.get(query, depth) if cache is not None else None
+        if query_results is None:
+            if positional is not None:
+                # Operadores de frase e proximidade e bônus de proximidade (posicional.py)
+                query_results = positional.search(postings, document_norms, query, term_rank, term_upper_bounds,
+                                                  depth, zero_similarities)
+            elif depth > 0:
+                query_results = score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds, depth)
+            else:
+                query_results = score_query(postings, document_norms, query, term_rank, zero_similarities)
+            if cache is not None:
+                cache.put(query, depth, query_results)
+        search_results.append((query_number, query_results))
+    return search_results
+
+def search_model_from_vector_model(vector_model, document_norms, term_upper_bounds):
+    # Estruturas do Buscador direto do modelo vetorial em memória (modo fundido), com postings
+    # (doc_ids, pesos) como os de indice_compacto e os termos na ordem do modelo, como na leitura do CSV
+    postings = {}
+    for term, (idf, document_data) in vector_model.items():
+        doc_ids = sorted(document_data)
+        postings[term] = (doc_ids, [document_data[doc_id] for doc_id in doc_ids])
+    term_rank = {term: rank for rank, term in enumerate(postings)}
+    return postings, document_norms, term_upper_bounds, term_rank
+
+def load_search_model(search_config, current_directory):
+    # Estruturas do Buscador conforme busca.cfg: (postings, normas, limites superiores, ordem dos termos)
+    if 'MEMORIA_COMPARTILHADA' in search_config:
+        # Modelo publicado por memoria_compartilhada.py: anexado somente para leitura, sem cópia,
+        # se publicado a partir dos arquivos atuais do modelo (sem eles, o segmento é usado como está)
+        from memoria_compartilhada import attach_shared_index, source_files, source_fingerprint
+        try:
+            fingerprint = source_fingerprint(source_files(search_config, current_directory))
+        except FileNotFoundError:
+            fingerprint = None
+        index = attach_shared_index(search_config['MEMORIA_COMPARTILHADA'], fingerprint)
+        if index is not None:
+            logging.info("\nModelo Vetorial Anexado da Memória Compartilhada %s", search_config['MEMORIA_COMPARTILHADA'])
+            return index.postings, index.document_norms, index.term_upper_bounds, index.term_rank
+        logging.info("\nMemória Compartilhada %s Indisponível - Carregando o Modelo Vetorial",
+                     search_config['MEMORIA_COMPARTILHADA'])
+
+    if 'INDICE' in search_config:
+        # Índice binário mapeado em memória: nenhuma etapa de parse na abertura
+        logging.info("\nAbrindo Índice Binário - Arquivo %s", os.path.join(current_directory, search_config['INDICE']))
+        index = open_binary_index(os.path.join(current_directory, search_config['INDICE']))
+        return index.postings, index.document_norms, index.term_upper_bounds, index.term_rank
+
+    model_file = os.path.join(current_directory, search_config['MODELO'])
+    norms_file = os.path.join(current_directory, search_config['NORMAS'])
+    snapshot_file = os.path.join(current_directory, search_config['SNAPSHOT']) if 'SNAPSHOT' in search_config else None
+    if snapshot_file is not None and snapshot_is_current(snapshot_file, (model_file, norms_file)):
+        # Snapshot mais recente que os CSVs: aberto com mmap, sem reconstruir as estruturas
+        logging.info("\nAbrindo Snapshot do Modelo Vetorial - Arquivo %s", snapshot_file)
+        index = open_binary_index(snapshot_file)
+        return index.postings, index.document_norms, index.term_upper_bounds, index.term_rank
+
+    # Carregar postings do modelo vetorial e normas dos documentos na representação compacta
+    index = load_compact_index(model_file, norms_file)
+    if snapshot_file is not None:
+        logging.info("\nGravando Snapshot do Modelo Vetorial - Arquivo %s", snapshot_file)
+        write_model_snapshot(index, snapshot_file)
+    return index.postings, index.document_norms, index.term_upper_bounds, index.term_rank
+
+def snapshot_is_current(snapshot_file, source_files):
+    if not os.path.exists(snapshot_file):
+        return False
+    snapshot_time = os.path.getmtime(snapshot_file)
+    return all(os.path.getmtime(source_file) <= snapshot_time for source_file in source_files)
+
+def snapshot_vector_model(index):
+    # O modelo carregado dos CSVs como entrada do índice binário, com a mesma ordem dos termos
+    # (e portanto a mesma ordem de soma dos pesos)
+    vector_model = {}
+    for term, (doc_ids, weights) in index.postings.items():
+        vector_model[term] = (0.0, dict(zip(doc_ids, weights)))
+    return vector_model
+
+def write_model_snapshot(index, snapshot_file):
+    # write_binary_index grava à parte e renomeia: outro processo nunca abre um snapshot incompleto
+    write_binary_index(snapshot_vector_model(index), index.document_norms, index.term_upper_bounds, snapshot_file)
+
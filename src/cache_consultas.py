@@ -0,0 +1,78 @@
+import os
+import time
+from collections import OrderedDict
+
+# Cache de resultados de consultas com descarte LRU. A chave é o conjunto de termos da
+# consulta, o número de termos (que entra na magnitude da consulta e portanto no escore),
+# a profundidade k e os operadores de frase e proximidade da consulta (posicional.py).
+#
+# O cache vale para um modelo vetorial carregado. Quem mantém o modelo residente (o
+# servidor de busca) acompanha a versão dos arquivos do modelo com ModelVersion e, quando
+# ela muda, recarrega o modelo e esvazia o cache. A versão (data de modificação e tamanho
+# de cada arquivo) é lida no máximo uma vez a cada CHECK_INTERVAL segundos, fora do
+# caminho de um acerto no cache.
+CHECK_INTERVAL = 1.0
+
+def query_key(query, depth):
+    return frozenset(query), len(query), depth, getattr(query, 'constraints', ())
+
+class ModelVersion:
+    def __init__(self, model_files, check_interval=CHECK_INTERVAL):
+        self.model_files = model_files
+        self.check_interval = check_interval
+        self.loaded = self.read()
+        self.latest = self.loaded
+        self.checked_at = time.monotonic()
+
+    def read(self):
+        # None enquanto algum arquivo não existe
+        try:
+            return tuple((status.st_mtime_ns, status.st_size) for status in map(os.stat, self.model_files))
+        except FileNotFoundError:
+            return None
+
+    def changed(self):
+        # Os arquivos mudaram desde a última carga do modelo
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            self.latest = self.read()
+        return self.latest is not None and self.latest != self.loaded
+
+    def mark_loaded(self):
+        self.loaded = self.latest
+
+class QueryResultCache:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, query, depth):
+        key = query_key(query, depth)
+        results = self.entries.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, query, depth, results):
+        key = query_key(query, depth)
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        # Modelo vetorial recarregado: nenhum resultado anterior vale mais
+        self.entries.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'entradas': len(self.entries), 'acertos': self.hits, 'falhas': self.misses,
+                'invalidacoes': self.invalidations, 'taxa_acerto': self.hits / total if total else 0.0}
@@ -0,0 +1,184 @@
+from bisect import bisect_left
+
+# Postings comprimidos: DocIDs ordenados gravados como diferenças (gaps) e frequências
+# brutas do termo, ambos em variable-byte (7 bits por byte, bit alto indica continuação).
+#
+# Layout de uma lista:
+#   n_postings, n_blocos
+#   tabela de saltos: para cada bloco, (último DocID - último DocID do bloco anterior,
+#                     tamanho do bloco em bytes)
+#   blocos: até BLOCK_SIZE pares (gap, tf), o gap do primeiro par relativo ao último
+#           DocID do bloco anterior
+#
+# A tabela de saltos permite que seek() pule blocos inteiros sem decodificá-los.
+BLOCK_SIZE = 128
+
+# Documento sentinela de um cursor que já percorreu toda a lista
+END_OF_POSTINGS = float('inf')
+
+def encode_varbyte(value, output):
+    while value >= 0x80:
+        output.append((value & 0x7F) | 0x80)
+        value >>= 7
+    output.append(value)
+
+def decode_varbyte(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def encode_postings(doc_frequencies, block_size=BLOCK_SIZE):
+    # doc_frequencies: pares (DocID, tf) ordenados por DocID
+    skip_table = bytearray()
+    blocks = bytearray()
+    previous_last = 0
+    for start in range(0, len(doc_frequencies), block_size):
+        block = bytearray()
+        previous = previous_last
+        for doc_id, tf in doc_frequencies[start:start + block_size]:
+            encode_varbyte(doc_id - previous, block)
+            encode_varbyte(tf, block)
+            previous = doc_id
+        encode_varbyte(previous - previous_last, skip_table)
+        encode_varbyte(len(block), skip_table)
+        blocks += block
+        previous_last = previous
+
+    output = bytearray()
+    encode_varbyte(len(doc_frequencies), output)
+    encode_varbyte((len(doc_frequencies) + block_size - 1) // block_size, output)
+    return bytes(output + skip_table + blocks)
+
+class CompressedPostingList:
+    # Lista de postings de um termo sobre bytes comprimidos (bytes, memoryview ou mmap).
+    # O peso é reconstruído como em process_inverted_list: (tf / ocorrências) * idf.
+    __slots__ = ('data', 'idf', 'occurrences', 'length', 'block_last_docs', 'block_starts')
+
+    def __init__(self, data, idf, occurrences):
+        self.data = data
+        self.idf = idf
+        self.occurrences = occurrences
+        self.length, position = decode_varbyte(data, 0)
+        n_blocks, position = decode_varbyte(data, position)
+
+        block_lengths = []
+        self.block_last_docs = []
+        last_doc = 0
+        for _ in range(n_blocks):
+            delta, position = decode_varbyte(data, position)
+            block_length, position = decode_varbyte(data, position)
+            last_doc += delta
+            self.block_last_docs.append(last_doc)
+            block_lengths.append(block_length)
+
+        self.block_starts = [position]
+        for block_length in block_lengths:
+            self.block_starts.append(self.block_starts[-1] + block_length)
+
+    def __len__(self):
+        return self.length
+
+    def decode_block(self, block):
+        doc_ids = []
+        frequencies = []
+        doc_id = self.block_last_docs[block - 1] if block else 0
+        position = self.block_starts[block]
+        end = self.block_starts[block + 1]
+        data = self.data
+        while position < end:
+            gap, position = decode_varbyte(data, position)
+            tf, position = decode_varbyte(data, position)
+            doc_id += gap
+            doc_ids.append(doc_id)
+            frequencies.append(tf)
+        return doc_ids, frequencies
+
+    def weight(self, tf):
+        return (tf / self.occurrences) * self.idf
+
+    def decode(self):
+        # Lista completa (doc_ids, pesos), no mesmo formato dos postings de indice_compacto
+        doc_ids = []
+        weights = []
+        for block in range(len(self.block_last_docs)):
+            block_docs, frequencies = self.decode_block(block)
+            doc_ids += block_docs
+            weights += [self.weight(tf) for tf in frequencies]
+        return doc_ids, weights
+
+    def cursor(self, rank):
+        return CompressedPostingCursor(self, rank)
+
+class CompressedPostingCursor:
+    # Mesma interface de buscador.PostingCursor, decodificando um bloco por vez
+    __slots__ = ('rank', 'postings', 'block', 'doc_ids', 'frequencies', 'position', 'doc')
+
+    def __init__(self, postings, rank):
+        self.rank = rank
+        self.postings = postings
+        self.block = -1
+        self.doc_ids = []
+        self.frequencies = []
+        self.position = 0
+        self.doc = END_OF_POSTINGS
+        self._enter_block(0)
+
+    def _enter_block(self, block):
+        self.block = block
+        self.position = 0
+        if block < len(self.postings.block_last_docs):
+            self.doc_ids, self.frequencies = self.postings.decode_block(block)
+            self.doc = self.doc_ids[0]
+        else:
+            self.doc_ids, self.frequencies = [], []
+            self.doc = END_OF_POSTINGS
+
+    def weight(self):
+        return self.postings.weight(self.frequencies[self.position])
+
+    def next(self):
+        self.position += 1
+        if self.position < len(self.doc_ids):
+            self.doc = self.doc_ids[self.position]
+        else:
+            self._enter_block(self.block + 1)
+
+    def seek(self, target):
+        # Avança até o primeiro documento >= target, pulando pela tabela de saltos
+        # os blocos cujo último DocID é menor que target
+        if self.doc >= target:
+            return
+        block_last_docs = self.postings.block_last_docs
+        if block_last_docs[self.block] < target:
+            block = bisect_left(block_last_docs, target, self.block + 1)
+            self._enter_block(block)
+            if self.doc >= target:
+                return
+        self.position = bisect_left(self.doc_ids, target, self.position)
+        self.doc = self.doc_ids[self.position]
+
+def intersect(cursors):
+    # Interseção conjuntiva de cursores (buscador.PostingCursor ou CompressedPostingCursor), o
+    # primeiro o da menor lista: cada cursor salta direto para o documento candidato, e os
+    # cursores comprimidos pulam pela tabela de saltos os blocos que não podem contê-lo
+    if not cursors:
+        return []
+    documents = []
+    candidate = cursors[0].doc
+    while candidate != END_OF_POSTINGS:
+        for cursor in cursors:
+            cursor.seek(candidate)
+            if cursor.doc != candidate:
+                candidate = cursor.doc
+                break
+        else:
+            documents.append(candidate)
+            cursors[0].next()
+            candidate = cursors[0].doc
+    return documents
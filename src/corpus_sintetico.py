@@ -0,0 +1,168 @@
+import argparse
+import logging
+import os
+import random
+from xml.sax.saxutils import escape
+
+# Gerador de coleções sintéticas no formato da coleção CF: arquivos de documentos
+# segundo cfc-2.dtd e um arquivo de consultas segundo cfc2-query.dtd. O vocabulário
+# segue uma distribuição de Zipf e cresce com a escala (lei de Heaps); cada documento
+# pertence a um tópico cujos termos são sorteados com maior frequência, e cada consulta
+# é formulada com termos de um tópico e julgada relevante para documentos desse tópico.
+# A mesma semente gera sempre a mesma coleção.
+#
+# Uso: python src/corpus_sintetico.py DIRETORIO [--escala E] [--consultas Q] [--arquivos A] [--semente S]
+CF_DOCUMENTS = 1239
+CF_QUERIES = 100
+CF_VOCABULARY = 10000
+FUNCTION_WORDS = ('the', 'of', 'and', 'in', 'to', 'a', 'with', 'was', 'were', 'is', 'for', 'that', 'by',
+                  'on', 'as', 'from', 'are', 'these', 'patients', 'at')
+SYLLABLES = ('ba', 'ce', 'di', 'fo', 'gu', 'ha', 'ki', 'lo', 'mu', 'ne', 'pi', 'ro', 'sa', 'te', 'vi',
+             'xa', 'zo', 'cys', 'fib', 'cus', 'pan', 'cre', 'as', 'pul', 'mon', 'ary', 'sis',
+             'ase', 'ine', 'ate', 'tic', 'gen', 'lyt', 'ol')
+QUESTION_PREFIXES = ('What are the effects of', 'What is the role of', 'Is there a relationship between',
+                     'How does', 'What is known about')
+TOPIC_TERMS = 30
+TOPIC_WEIGHT = 0.35
+
+def build_vocabulary(size, rng):
+    # Termos distintos formados por sílabas; o índice na lista é a posição no ranking de Zipf
+    vocabulary = list(FUNCTION_WORDS)
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+def zipf_weights(size, exponent=1.0):
+    cumulative = []
+    total = 0.0
+    for rank in range(1, size + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+class SyntheticCollection:
+    def __init__(self, documents, queries=CF_QUERIES, seed=0):
+        self.documents = documents
+        self.queries = queries
+        self.seed = seed
+        rng = random.Random(seed)
+        vocabulary_size = max(2000, int(CF_VOCABULARY * (documents / CF_DOCUMENTS) ** 0.5))
+        self.vocabulary = build_vocabulary(vocabulary_size, rng)
+        self.cumulative_weights = zipf_weights(len(self.vocabulary))
+        self.topics = max(10, documents // 40)
+        # Termos característicos de cada tópico, fora da faixa das palavras funcionais
+        self.topic_terms = [rng.sample(self.vocabulary[len(FUNCTION_WORDS):], TOPIC_TERMS) for _ in range(self.topics)]
+        self.document_topics = [rng.randrange(self.topics) for _ in range(documents)]
+
+    def words(self, rng, topic, count):
+        common = rng.choices(self.vocabulary, cum_weights=self.cumulative_weights, k=count)
+        return [rng.choice(self.topic_terms[topic]) if rng.random() < TOPIC_WEIGHT else word for word in common]
+
+    def sentences(self, rng, topic, count):
+        words = self.words(rng, topic, count)
+        text = []
+        for start in range(0, len(words), 18):
+            sentence = ' '.join(words[start:start + 18])
+            text.append(sentence[0].upper() + sentence[1:] + '.')
+        return '\n'.join(text)
+
+    def record(self, record_num, file_year):
+        # Um RECORD com os elementos de cfc-2.dtd; ~10% dos registros trazem EXTRACT em vez de ABSTRACT
+        rng = random.Random(self.seed * 1000003 + record_num)
+        topic = self.document_topics[record_num - 1]
+        authors = ''.join(f'\t\t\t<AUTHOR>{escape(rng.choice(self.vocabulary).capitalize())}-{rng.choice("ABCDEHJKLMNR")}</AUTHOR>\n'
+                          for _ in range(rng.randint(1, 5)))
+        major = ''.join(f'\t\t\t<TOPIC>{escape(term.upper())}</TOPIC>\n' for term in rng.sample(self.topic_terms[topic], 3))
+        minor = ''.join(f'\t\t\t<TOPIC>{escape(term.upper())}</TOPIC>\n' for term in rng.sample(self.topic_terms[topic], 5))
+        text_tag = 'EXTRACT' if rng.random() < 0.1 else 'ABSTRACT'
+        text = escape(self.sentences(rng, topic, rng.randint(60, 260)))
+        cites = ''.join(f'\t\t\t<CITE num="{i:03d}" author="{escape(rng.choice(self.vocabulary).upper())} {rng.choice("ABCDEHJKLMNR")}" '
+                        f'publication="{escape(rng.choice(self.vocabulary).upper())}" d1="{rng.randint(1, 99)}" '
+                        f'd2="{rng.randint(1, 999)}" d3="{rng.randint(950, 979)}"/>\n'
+                        for i in range(1, rng.randint(2, 12)))
+        return (f'\t<RECORD>\n'
+                f'\t\t<PAPERNUM>PN{file_year}{record_num:03d}</PAPERNUM>\n'
+                f'\t\t<RECORDNUM>{record_num:05d} </RECORDNUM>\n'
+                f'\t\t<MEDLINENUM>{rng.randint(10000000, 99999999)}</MEDLINENUM>\n'
+                f'\t\t<AUTHORS>\n{authors}\t\t</AUTHORS>\n'
+                f'\t\t<TITLE>{escape(self.sentences(rng, topic, rng.randint(6, 20)))}</TITLE>\n'
+                f'\t\t<SOURCE>Synthetic-J. 19{file_year}. {rng.randint(1, 99)}({rng.randint(1, 12)}). P {rng.randint(1, 999)}</SOURCE>\n'
+                f'\t\t<MAJORSUBJ>\n{major}\t\t</MAJORSUBJ>\n'
+                f'\t\t<MINORSUBJ>\n{minor}\t\t</MINORSUBJ>\n'
+                f'\t\t<{text_tag}>{text}</{text_tag}>\n'
+                f'\t\t<REFERENCES>\n{cites}\t\t</REFERENCES>\n'
+                f'\t</RECORD>\n')
+
+    def write_documents(self, output_dir, files=6):
+        # Registros numerados de 1 a N, divididos em arquivos consecutivos como cf74.xml ... cf79.xml
+        paths = []
+        per_file = -(-self.documents // files)
+        for index in range(files):
+            first, last = index * per_file + 1, min((index + 1) * per_file, self.documents)
+            if first > last:
+                break
+            file_year = 74 + index
+            path = os.path.join(output_dir, f'cf{file_year}.xml')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('<?xml version="1.0"?>\n<!DOCTYPE FILE SYSTEM "cfc-2.dtd">\n<FILE>\n')
+                for record_num in range(first, last + 1):
+                    file.write(self.record(record_num, file_year))
+                file.write('</FILE>\n')
+            paths.append(path)
+        return paths
+
+    def write_queries(self, output_dir):
+        # Consultas segundo cfc2-query.dtd; documentos relevantes escolhidos entre os do mesmo tópico
+        rng = random.Random(self.seed * 1000003 - 1)
+        documents_by_topic = [[] for _ in range(self.topics)]
+        for doc_id, topic in enumerate(self.document_topics, start=1):
+            documents_by_topic[topic].append(doc_id)
+        path = os.path.join(output_dir, 'cfquery.xml')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('<?xml version="1.0"?>\n<!DOCTYPE FILEQUERY SYSTEM "cfc2-query.dtd">\n<FILEQUERY>\n')
+            for query_number in range(1, self.queries + 1):
+                topic = rng.randrange(self.topics)
+                terms = rng.sample(self.topic_terms[topic], rng.randint(2, 6)) + rng.sample(self.vocabulary[:200], rng.randint(0, 3))
+                text = f'{rng.choice(QUESTION_PREFIXES)} {" ".join(terms)}?'
+                candidates = documents_by_topic[topic] or [1]
+                relevant = sorted(rng.sample(candidates, min(len(candidates), rng.randint(5, 40))))
+                items = ''
+                for doc_id in relevant:
+                    score = ''.join(rng.choice('0012') for _ in range(4))
+                    if score == '0000':
+                        score = '0001'
+                    items += f'\t\t\t<Item score="{score}">{doc_id}</Item>\n'
+                file.write(f'\t<QUERY>\n'
+                           f'\t\t<QueryNumber>{query_number:05d}</QueryNumber>\n'
+                           f'\t\t<QueryText>{escape(text)}\n</QueryText>\n'
+                           f'\t\t<Results>{len(relevant):05d}</Results>\n'
+                           f'\t\t<Records>\n{items}\t\t</Records>\n'
+                           f'\t</QUERY>\n')
+            file.write('</FILEQUERY>\n')
+        return path
+
+def generate_collection(output_dir, scale=1.0, queries=CF_QUERIES, files=6, seed=0):
+    # Gera a coleção em output_dir e retorna (arquivos de documentos, arquivo de consultas)
+    os.makedirs(output_dir, exist_ok=True)
+    collection = SyntheticCollection(max(1, round(CF_DOCUMENTS * scale)), queries, seed)
+    logging.info("\nGerando Coleção Sintética - %s Documentos, %s Consultas", collection.documents, collection.queries)
+    return collection.write_documents(output_dir, files), collection.write_queries(output_dir)
+
+def main_generator():
+    parser = argparse.ArgumentParser(description='Gerador de coleções sintéticas no formato CF')
+    parser.add_argument('diretorio')
+    parser.add_argument('--escala', type=float, default=1.0, help='número de documentos relativo à coleção CF (1239)')
+    parser.add_argument('--consultas', type=int, default=CF_QUERIES)
+    parser.add_argument('--arquivos', type=int, default=6)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    document_files, query_file = generate_collection(args.diretorio, args.escala, args.consultas, args.arquivos, args.semente)
+    for path in document_files + [query_file]:
+        print(path)
+
+if __name__ == "__main__":
+    main_generator()
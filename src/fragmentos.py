@@ -0,0 +1,134 @@
+import heapq
+import logging
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import buscador
+from indice_binario import open_binary_index, write_binary_index
+
+# Índice fragmentado: os documentos são divididos em N faixas contíguas de DocID e cada
+# fragmento é gravado como um índice binário próprio. Os pesos já incorporam o IDF global
+# da coleção, de modo que cada fragmento calcula exatamente os mesmos escores do índice
+# único para os seus documentos. Na busca, cada fragmento é aberto (mmap) por um processo
+# dedicado; todas as consultas são enviadas a todos os fragmentos e os rankings parciais
+# são intercalados por um merge com heap.
+#
+# index.cfg: FRAGMENTOS=N grava <INDICE>.fragmento<i>.bin e o número de fragmentos em
+#            <INDICE>.fragmentos
+# busca.cfg: FRAGMENTOS=N busca nos N fragmentos de <INDICE>; N diferente do número gravado
+#            pelo Indexador é um erro
+
+def shard_file(index_file, shard):
+    return f'{os.path.splitext(index_file)[0]}.fragmento{shard}.bin'
+
+def shard_count_file(index_file):
+    return f'{os.path.splitext(index_file)[0]}.fragmentos'
+
+def read_shard_count(index_file):
+    with open(shard_count_file(index_file), 'r') as file:
+        return int(file.read())
+
+def shard_boundaries(documents, shard_count):
+    # Primeiro DocID de cada fragmento a partir do segundo, com o mesmo número de documentos em cada um
+    documents = sorted(documents)
+    return [documents[len(documents) * shard // shard_count] for shard in range(1, shard_count)]
+
+def partition_vector_model(vector_model, document_norms, shard_count):
+    # Um (modelo vetorial, normas) por fragmento; os termos mantêm a ordem do modelo completo,
+    # e portanto a ordem da soma dos pesos em score_query
+    boundaries = shard_boundaries(document_norms, shard_count)
+    shards = [({}, {}) for _ in range(shard_count)]
+    for term, (idf, document_data) in vector_model.items():
+        for document, weight in document_data.items():
+            shard_model = shards[bisect_right(boundaries, document)][0]
+            if term not in shard_model:
+                shard_model[term] = (idf, {})
+            shard_model[term][1][document] = weight
+    for document, norm in document_norms.items():
+        shards[bisect_right(boundaries, document)][1][document] = norm
+    return shards
+
+def write_shards(vector_model, document_norms, index_file, shard_count):
+    # Os fragmentos não são comprimidos: o formato comprimido recalcula os pesos a partir
+    # das ocorrências do termo, que dentro de um fragmento não são as da coleção. Cada
+    # fragmento é gravado à parte e renomeado por write_binary_index. O número de fragmentos
+    # é removido antes e gravado por último: fragmentos incompletos não são abertos pela busca
+    count_file = shard_count_file(index_file)
+    if os.path.exists(count_file):
+        os.remove(count_file)
+    for shard, (shard_model, shard_norms) in enumerate(partition_vector_model(vector_model, document_norms, shard_count)):
+        upper_bounds = buscador.compute_term_upper_bounds(
+            {term: document_data.items() for term, (idf, document_data) in shard_model.items()}, shard_norms)
+        write_binary_index(shard_model, shard_norms, upper_bounds, shard_file(index_file, shard))
+        logging.info("Fragmento %s Gravado - %s Documentos, %s Termos", shard, len(shard_norms), len(shard_model))
+
+    # Fragmentos de uma execução anterior com mais fragmentos são removidos
+    shard = shard_count
+    while os.path.exists(shard_file(index_file, shard)):
+        os.remove(shard_file(index_file, shard))
+        shard += 1
+    with open(count_file + '.tmp', 'w') as file:
+        file.write(str(shard_count))
+    os.replace(count_file + '.tmp', count_file)
+
+# Fragmento aberto pelo processo de busca (inicializador do pool)
+_shard_index = None
+
+def open_shard(path):
+    global _shard_index
+    _shard_index = open_binary_index(path)
+
+def search_shard(queries, depth):
+    # Rankings parciais de todas as consultas no fragmento deste processo
+    index = _shard_index
+    if depth > 0:
+        return [buscador.score_query_top_k(index.postings, index.document_norms, query, index.term_rank,
+                                       index.term_upper_bounds, depth) for query in queries]
+    zero_similarities = buscador.zero_similarity_results(index.document_norms)
+    return [buscador.score_query(index.postings, index.document_norms, query, index.term_rank, zero_similarities)
+            for query in queries]
+
+class ShardedSearch:
+    # Um processo por fragmento, cada um com o seu fragmento mapeado em memória
+    def __init__(self, shard_files):
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=open_shard, initargs=(path,))
+                          for path in shard_files]
+
+    def search(self, queries, depth=0):
+        logging.info("\nRealizando a Busca em %s Fragmentos", len(self.executors))
+        query_terms = list(queries.values())
+        futures = [executor.submit(search_shard, query_terms, depth) for executor in self.executors]
+        shard_results = [future.result() for future in futures]
+
+        search_results = []
+        for query_number, partial_results in zip(queries, zip(*shard_results)):
+            # Rankings parciais já ordenados por (similaridade, DocID) decrescentes
+            merged = heapq.merge(*partial_results, reverse=True)
+            search_results.append((query_number, list(islice(merged, depth)) if depth > 0 else list(merged)))
+        return search_results
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_sharded_search(index_file, shard_count):
+    # Confere FRAGMENTOS de busca.cfg com os fragmentos gravados pelo Indexador
+    try:
+        written = read_shard_count(index_file)
+    except FileNotFoundError:
+        raise ValueError(f'Índice fragmentado não encontrado: {shard_count_file(index_file)} '
+                         '(execute o Indexador com FRAGMENTOS em index.cfg)') from None
+    if written != shard_count:
+        raise ValueError(f'busca.cfg FRAGMENTOS={shard_count}, mas o Indexador gravou {written} fragmentos de {index_file}')
+    shard_files = [shard_file(index_file, shard) for shard in range(shard_count)]
+    missing = [path for path in shard_files if not os.path.exists(path)]
+    if missing:
+        raise ValueError(f'Fragmentos do índice não encontrados: {", ".join(missing)}')
+    return ShardedSearch(shard_files)
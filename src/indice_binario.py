@@ -0,0 +1,216 @@
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+import numpy as np
+from compressao import CompressedPostingList, encode_postings
+
+# Formato binário do modelo vetorial, lido diretamente via mmap sem etapa de parse.
+#
+# Cabeçalho (little-endian): assinatura de 8 bytes seguida de 6 inteiros uint64
+#   versão, número de termos, número de postings, tamanho da tabela de normas,
+#   tamanho em bytes do dicionário de termos e flags.
+# Seções, nesta ordem e alinhadas em 8 bytes:
+#   term_offsets     uint64[termos + 1]   início de cada termo no dicionário
+#   term_bytes       bytes                termos em UTF-8, ordenados
+#   term_ranks       uint32[termos]       posição do termo no modelo vetorial
+#   upper_bounds     float64[termos]      limite superior (max_score) de cada termo
+#   posting_offsets  uint64[termos + 1]   início dos postings de cada termo
+#   doc_ids          int32[postings]      documentos, ordenados dentro de cada termo
+#   weights          float64[postings]    pesos tf/idf
+#   norms            float64[documentos]  norma indexada pelo DocID (NaN se ausente)
+#
+# Com a flag FLAG_COMPRESSED, doc_ids e weights são substituídos por postings
+# comprimidos (ver compressao.py) e posting_offsets passa a contar bytes:
+#   idfs             float64[termos]      IDF de cada termo
+#   occurrences      uint64[termos]       total de ocorrências de cada termo
+#   compressed       bytes                listas comprimidas, uma após a outra
+MAGIC = b'RIVECBIN'
+VERSION = 1
+FLAG_COMPRESSED = 1
+HEADER = struct.Struct('<8s6Q')
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def encode_binary_index(vector_model, document_norms, term_upper_bounds, inverted_list=None):
+    # Cabeçalho e seções já alinhadas, na ordem do formato; com inverted_list (frequências
+    # brutas de process_inverted_list) os postings são comprimidos
+    terms = list(vector_model)
+    term_ranks = {term: rank for rank, term in enumerate(terms)}
+    encoded_terms = sorted((term.encode('utf-8'), term) for term in terms)
+
+    term_offsets = [0]
+    for encoded, term in encoded_terms:
+        term_offsets.append(term_offsets[-1] + len(encoded))
+
+    posting_offsets = [0]
+    doc_ids = []
+    weights = []
+    compressed = []
+    n_postings = 0
+    for encoded, term in encoded_terms:
+        idf, document_data = vector_model[term]
+        if inverted_list is None:
+            for document in sorted(document_data):
+                doc_ids.append(document)
+                weights.append(document_data[document])
+            posting_offsets.append(len(doc_ids))
+        else:
+            frequencies = {}
+            for document in inverted_list[term]:
+                frequencies[document] = frequencies.get(document, 0) + 1
+            compressed.append(encode_postings(sorted(frequencies.items())))
+            posting_offsets.append(posting_offsets[-1] + len(compressed[-1]))
+        n_postings += len(document_data)
+
+    norms = np.full(max(document_norms, default=-1) + 1, np.nan, dtype='<f8')
+    for document, norm in document_norms.items():
+        norms[document] = norm
+
+    sections = [
+        np.asarray(term_offsets, dtype='<u8').tobytes(),
+        b''.join(encoded for encoded, term in encoded_terms),
+        np.asarray([term_ranks[term] for encoded, term in encoded_terms], dtype='<u4').tobytes(),
+        np.asarray([term_upper_bounds[term] for encoded, term in encoded_terms], dtype='<f8').tobytes(),
+        np.asarray(posting_offsets, dtype='<u8').tobytes(),
+    ]
+    if inverted_list is None:
+        flags = 0
+        sections += [
+            np.asarray(doc_ids, dtype='<i4').tobytes(),
+            np.asarray(weights, dtype='<f8').tobytes(),
+        ]
+    else:
+        flags = FLAG_COMPRESSED
+        sections += [
+            np.asarray([vector_model[term][0] for encoded, term in encoded_terms], dtype='<f8').tobytes(),
+            np.asarray([len(inverted_list[term]) for encoded, term in encoded_terms], dtype='<u8').tobytes(),
+            b''.join(compressed),
+        ]
+    sections.append(norms.tobytes())
+
+    chunks = [HEADER.pack(MAGIC, VERSION, len(terms), n_postings, len(norms), term_offsets[-1], flags)]
+    for section in sections:
+        chunks.append(section + b'\0' * (_align(len(section)) - len(section)))
+    return chunks
+
+def write_binary_index(vector_model, document_norms, term_upper_bounds, output_file, inverted_list=None):
+    # O índice é gravado em um arquivo temporário e renomeado: um Buscador ou servidor que
+    # tenha o arquivo anterior mapeado continua com ele, e nenhum abre um índice incompleto
+    temporary_file = output_file + '.tmp'
+    with open(temporary_file, 'wb') as file:
+        for chunk in encode_binary_index(vector_model, document_norms, term_upper_bounds, inverted_list):
+            file.write(chunk)
+    os.replace(temporary_file, output_file)
+
+class BinaryIndex:
+    # Modelo vetorial sobre um buffer no formato binário (mmap ou memória compartilhada).
+    # Nenhuma seção é copiada ou convertida na abertura: os arrays são visões NumPy do
+    # buffer e os termos são localizados por busca binária no dicionário ordenado.
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        magic, version, n_terms, n_postings, n_norms, n_term_bytes, flags = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Arquivo não está no formato binário do modelo vetorial')
+        self.n_terms = n_terms
+        self.compressed = bool(flags & FLAG_COMPRESSED)
+
+        offset = HEADER.size
+        self.term_offsets, offset = self._view(offset, '<u8', n_terms + 1)
+        self.term_bytes_offset = offset
+        offset = _align(offset + n_term_bytes)
+        self.term_ranks, offset = self._view(offset, '<u4', n_terms)
+        self.upper_bounds, offset = self._view(offset, '<f8', n_terms)
+        self.posting_offsets, offset = self._view(offset, '<u8', n_terms + 1)
+        if self.compressed:
+            self.idfs, offset = self._view(offset, '<f8', n_terms)
+            self.occurrences, offset = self._view(offset, '<u8', n_terms)
+            self.compressed_offset = offset
+            offset = _align(offset + int(self.posting_offsets[-1]))
+        else:
+            self.doc_ids, offset = self._view(offset, '<i4', n_postings)
+            self.weights, offset = self._view(offset, '<f8', n_postings)
+        self.norms, offset = self._view(offset, '<f8', n_norms)
+
+        self.postings = _TermMapping(self, self._postings_at)
+        self.term_rank = _TermMapping(self, lambda i: int(self.term_ranks[i]))
+        self.term_upper_bounds = _TermMapping(self, lambda i: float(self.upper_bounds[i]))
+        self.document_norms = DocumentNorms(self.norms)
+
+    def _view(self, offset, dtype, count):
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset)
+        return array, _align(offset + array.nbytes)
+
+    def term_at(self, i):
+        start = self.term_bytes_offset + int(self.term_offsets[i])
+        end = self.term_bytes_offset + int(self.term_offsets[i + 1])
+        return bytes(self.buffer[start:end])
+
+    def find(self, term):
+        # Busca binária no dicionário ordenado de termos; -1 se o termo não existe
+        encoded = term.encode('utf-8')
+        low, high = 0, self.n_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self.term_at(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_terms and self.term_at(low) == encoded:
+            return low
+        return -1
+
+    def _postings_at(self, i):
+        start = int(self.posting_offsets[i])
+        end = int(self.posting_offsets[i + 1])
+        if self.compressed:
+            data = self.buffer[self.compressed_offset + start:self.compressed_offset + end]
+            return CompressedPostingList(data, self.idfs.item(i), self.occurrences.item(i))
+        return self.doc_ids[start:end], self.weights[start:end]
+
+class _TermMapping(Mapping):
+    # Dicionário somente leitura de termo para um valor calculado a partir do índice do termo
+
+    def __init__(self, index, value_at):
+        self.index = index
+        self.value_at = value_at
+
+    def __getitem__(self, term):
+        i = self.index.find(term)
+        if i < 0:
+            raise KeyError(term)
+        return self.value_at(i)
+
+    def __iter__(self):
+        for i in range(self.index.n_terms):
+            yield self.index.term_at(i).decode('utf-8')
+
+    def __len__(self):
+        return self.index.n_terms
+
+class DocumentNorms(Mapping):
+    # Normas indexadas diretamente pelo DocID; NaN marca DocIDs fora da coleção
+
+    def __init__(self, norms):
+        self.norms = norms
+
+    def __getitem__(self, document):
+        if not 0 <= document < len(self.norms):
+            raise KeyError(document)
+        norm = self.norms.item(document)
+        if norm != norm:  # NaN
+            raise KeyError(document)
+        return norm
+
+    def __iter__(self):
+        return iter(np.flatnonzero(~np.isnan(self.norms)).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.norms)))
+
+def open_binary_index(file_path):
+    with open(file_path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return BinaryIndex(buffer)
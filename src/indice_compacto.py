@@ -0,0 +1,94 @@
+import logging
+import sys
+from array import array
+from ast import literal_eval
+from collections.abc import Mapping
+import numpy as np
+from indice_binario import DocumentNorms
+
+# Representação compacta do modelo vetorial em memória. Em vez de um dicionário de
+# tuplas (termo, peso) por documento, cada termo internado recebe um identificador
+# inteiro e os dados ficam em colunas contíguas: DocIDs em array('i'), pesos e limites
+# superiores em array('d'), e o início dos postings de cada termo em array('q'). As
+# normas ficam em um único array indexado pelo DocID. A carga cria apenas a string e o
+# identificador de cada termo; nenhum objeto por posting sobrevive ao parse.
+
+class CompactIndex:
+    # Mesma interface de BinaryIndex: postings, document_norms, term_upper_bounds e term_rank
+
+    def __init__(self, term_ids, offsets, doc_ids, weights, upper_bounds, norms):
+        self.term_ids = term_ids
+        self.offsets = offsets
+        self.doc_ids = memoryview(doc_ids)
+        self.weights = memoryview(weights)
+        self.upper_bounds = upper_bounds
+        self.postings = _TermMapping(term_ids, self._postings_of)
+        self.term_upper_bounds = _TermMapping(term_ids, upper_bounds.__getitem__)
+        self.term_rank = _TermMapping(term_ids, int)
+        self.document_norms = DocumentNorms(norms)
+
+    def _postings_of(self, term_id):
+        # Visões (memoryview) das colunas, sem cópia
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+class _TermMapping(Mapping):
+    # Dicionário somente leitura de termo para um valor calculado a partir do identificador
+
+    def __init__(self, term_ids, value_of):
+        self.term_ids = term_ids
+        self.value_of = value_of
+
+    def __getitem__(self, term):
+        return self.value_of(self.term_ids[term])
+
+    def __iter__(self):
+        return iter(self.term_ids)
+
+    def __len__(self):
+        return len(self.term_ids)
+
+def load_compact_index(vector_model_file, norms_file):
+    logging.info("\nCarregando Modelo Vetorial Compacto - Leitura CSV")
+    term_ids = {}
+    offsets = array('q', [0])
+    doc_ids = array('i')
+    weights = array('d')
+    upper_bounds = array('d')
+    missing_bounds = False
+    with open(vector_model_file, 'r') as file:
+        next(file)
+        for line in file:
+            word, data_str, *max_score = line.strip().split(';')
+            data = literal_eval(data_str)
+            # O termo é internado: a mesma string serve de chave aqui e nas consultas
+            term_ids[sys.intern(word)] = len(term_ids)
+            term_doc_ids = sorted(data)
+            doc_ids.extend(term_doc_ids)
+            weights.extend([data[doc_id] for doc_id in term_doc_ids])
+            offsets.append(len(doc_ids))
+            if max_score and max_score[0]:
+                upper_bounds.append(float(max_score[0]))
+            else:
+                upper_bounds.append(0.0)
+                missing_bounds = True
+
+    documents = array('i')
+    document_norms = array('d')
+    with open(norms_file, 'r') as file:
+        next(file)
+        for line in file:
+            document, norm = line.strip().split(';')
+            documents.append(int(document))
+            document_norms.append(float(norm))
+    norms = np.full(max(documents, default=-1) + 1, np.nan)
+    norms[np.frombuffer(documents, dtype=np.int32)] = np.frombuffer(document_norms, dtype=np.float64)
+
+    if missing_bounds:
+        # Modelo vetorial sem a coluna max_score: limites calculados a partir das normas
+        logging.info("\nModelo Vetorial sem limites superiores - calculando a partir das normas")
+        for term_id in range(len(term_ids)):
+            start, end = offsets[term_id], offsets[term_id + 1]
+            upper_bounds[term_id] = max((weights[i] / norms[doc_ids[i]] for i in range(start, end) if norms[doc_ids[i]]),
+                                        default=0.0)
+    return CompactIndex(term_ids, offsets, doc_ids, weights, upper_bounds, norms)
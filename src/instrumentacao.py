@@ -0,0 +1,186 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+# Instrumentação do sistema: temporizadores de alta resolução e contadores em torno das
+# funções mais custosas, perfil opcional (cProfile ou tracemalloc) e um relatório JSON
+# por execução. As funções são substituídas por versões instrumentadas nos módulos
+# apenas quando INSTRUMENTACAO=SIM em execucao.cfg; desligada, nenhum código é alterado
+# e o custo é nulo. Processos do pool (PROCESSOS > 1) não são instrumentados.
+#
+# execucao.cfg:
+#   INSTRUMENTACAO=SIM|NAO
+#   PERFIL=NENHUM|CPROFILE|TRACEMALLOC
+#   RELATORIO=RESULT\instrumentacao.json
+
+def vector_model_postings(args, result):
+    return sum(len(document_data) for idf, document_data in args[0].values())
+
+def search_results_rows(args, result):
+    return sum(len(query_results) for query_id, query_results in args[0])
+
+def positive_similarities(args, result):
+    # Documentos com escore acumulado (os de similaridade zero vêm da lista pré-calculada)
+    return sum(1 for similarity, doc_id in result if similarity)
+
+# (função, contador, valor a somar ao contador a partir dos argumentos e do retorno)
+HOT_FUNCTIONS = {
+    'main': [
+        ('literal_eval', None, None),
+        ('generate_inverted_list', None, None),
+        ('write_inverted_list_to_csv', 'postings_gravados',
+         lambda args, result: sum(len(doc_ids) for doc_ids in args[0].values())),
+        ('load_inverted_list', None, None),
+        ('process_inverted_list', None, None),
+        ('process_term_frequencies', None, None),
+        ('compute_document_norms', None, None),
+        ('compute_term_upper_bounds', None, None),
+        ('write_vector_model', 'postings_gravados', vector_model_postings),
+        ('write_document_norms', None, None),
+        ('write_binary_index', None, None),
+        ('load_search_model', None, None),
+        ('load_queries', 'consultas_carregadas', lambda args, result: len(result)),
+        ('write_search_results', 'resultados_gravados', search_results_rows),
+    ],
+    # Funções chamadas por perform_search e pelo índice posicional, substituídas no próprio
+    # módulo do Buscador
+    'buscador': [
+        ('score_query', 'similaridades_calculadas', positive_similarities),
+        ('score_query_top_k', 'similaridades_calculadas', lambda args, result: len(result)),
+    ],
+    'analisador': [
+        ('word_tokenize', 'tokens_produzidos', lambda args, result: len(result)),
+    ],
+    'indice_compacto': [
+        ('literal_eval', None, None),
+    ],
+}
+# Geradores: o tempo é medido em cada next() e o contador soma um por item produzido
+HOT_GENERATORS = {
+    'main': [
+        ('iter_xml_records', 'documentos_processados'),
+        ('iter_queries', 'consultas_processadas'),
+    ],
+}
+
+class Instrumentation:
+    def __init__(self, profile='NENHUM'):
+        self.profile = profile
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.counters = Counter()
+        self.stages = {}
+        self.patched = []
+        self.profiler = None
+        self.started = datetime.now()
+
+    def timed(self, name, function, counter=None, count=None):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.seconds[name] += time.perf_counter() - start_time
+            self.calls[name] += 1
+            if counter is not None:
+                self.counters[counter] += count(args, result)
+            return result
+        return wrapper
+
+    def timed_generator(self, name, function, counter):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            self.calls[name] += 1
+            iterator = function(*args, **kwargs)
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.seconds[name] += time.perf_counter() - start_time
+                    return
+                self.seconds[name] += time.perf_counter() - start_time
+                self.counters[counter] += 1
+                yield item
+        return wrapper
+
+    def patch(self, module, attribute, replacement):
+        self.patched.append((module, attribute, getattr(module, attribute)))
+        setattr(module, attribute, replacement)
+
+    def instrument(self, modules):
+        # modules: nome -> módulo já importado; funções ausentes no módulo são ignoradas
+        for module_name, module in modules.items():
+            for attribute, counter, count in HOT_FUNCTIONS.get(module_name, []):
+                if hasattr(module, attribute):
+                    self.patch(module, attribute, self.timed(f'{module_name}.{attribute}', getattr(module, attribute), counter, count))
+            for attribute, counter in HOT_GENERATORS.get(module_name, []):
+                if hasattr(module, attribute):
+                    self.patch(module, attribute, self.timed_generator(f'{module_name}.{attribute}', getattr(module, attribute), counter))
+
+    def restore(self):
+        for module, attribute, original in reversed(self.patched):
+            setattr(module, attribute, original)
+        self.patched = []
+
+    def record_stage(self, name, seconds):
+        self.stages[name] = seconds
+
+    def start_profile(self):
+        if self.profile == 'CPROFILE':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == 'TRACEMALLOC':
+            tracemalloc.start()
+
+    def stop_profile(self, profile_file, limit=25):
+        # Resumo do perfil para o relatório: funções por tempo acumulado ou linhas por memória alocada.
+        # O perfil completo do cProfile é gravado em profile_file (pstats, snakeviz).
+        if self.profile == 'CPROFILE' and self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(profile_file)
+            stats = pstats.Stats(self.profiler)
+            functions = []
+            for (file_name, line, function), (primitive_calls, calls, total, cumulative, callers) in stats.stats.items():
+                functions.append({'funcao': f'{file_name}:{line}({function})', 'chamadas': calls,
+                                  'tempo_proprio': total, 'tempo_acumulado': cumulative})
+            functions.sort(key=lambda entry: entry['tempo_acumulado'], reverse=True)
+            return {'tipo': 'cProfile', 'arquivo': profile_file, 'funcoes': functions[:limit]}
+        if self.profile == 'TRACEMALLOC' and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            allocations = [{'linha': str(statistic.traceback[0]), 'kb': statistic.size / 1024, 'blocos': statistic.count}
+                           for statistic in snapshot.statistics('lineno')[:limit]]
+            return {'tipo': 'tracemalloc', 'pico_kb': peak / 1024, 'atual_kb': current / 1024, 'alocacoes': allocations}
+        return None
+
+    def report(self, profile_summary=None):
+        functions = {name: {'chamadas': self.calls[name], 'segundos': self.seconds[name],
+                            'media_us': self.seconds[name] / self.calls[name] * 1e6 if self.calls[name] else 0.0}
+                     for name in sorted(self.calls, key=self.seconds.__getitem__, reverse=True)}
+        return {'inicio': self.started.isoformat(timespec='seconds'), 'etapas': self.stages,
+                'funcoes': functions, 'contadores': dict(self.counters), 'perfil': profile_summary}
+
+    def finish(self, report_file):
+        profile_summary = self.stop_profile(os.path.splitext(report_file)[0] + '.prof')
+        self.restore()
+        with open(report_file, 'w') as file:
+            json.dump(self.report(profile_summary), file, indent=1)
+        logging.info("\nRelatório de Instrumentação Gravado - Arquivo %s", report_file)
+
+def start_instrumentation(run_config, modules):
+    # Retorna None quando a instrumentação está desligada
+    if run_config.get('INSTRUMENTACAO', 'NAO') != 'SIM':
+        return None
+    instrumentation = Instrumentation(run_config.get('PERFIL', 'NENHUM'))
+    instrumentation.instrument(modules)
+    instrumentation.start_profile()
+    logging.info("\nInstrumentação Ativada - Perfil %s", instrumentation.profile)
+    return instrumentation
@@ -2,37 +2,39 @@ import xml.etree.ElementTree as ET
 import os
 import csv
 import math
-from nltk.tokenize import word_tokenize
 import xml.etree.ElementTree as ET
 from ast import literal_eval
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from math import sqrt
+import heapq
 import logging
+import sys
 import time
+import analisador
+from analisador import load_analyzer, load_stop_words
+import buscador
+from buscador import (compute_term_upper_bounds, load_queries, load_search_model, perform_search, read_configuration_file,
+                      search_model_from_vector_model)
+from cache_consultas import QueryResultCache
+from indice_binario import write_binary_index
+import indice_compacto
+from instrumentacao import start_instrumentation
+from segmentos import inverted_list_from_segments, load_segments, merge_segments, update_segments
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-def read_configuration_file(file_path):
-    instructions = {}
-    with open(file_path, 'r') as file:
-        for line in file:
-            key, value = line.strip().split('=')
-            instructions[key.strip()] = value.strip()
-    return instructions
-
 def calculate_votes(score):
     return sum(int(digit) for digit in str(score))
 
-def process_queries(xml_file, output_processed_queries, output_expected_results):
-    queries = {}
-
-    # Parse XML file
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-
-    # Processar cada consulta
-    logging.info("\nProcessando cada Consulta")
-    for raw_query in root.iter('QUERY'):
+def iter_queries(xml_file):
+    # Leitura em streaming (iterparse): cada QUERY é processada e descartada ao ser fechada
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    event, root = next(context)
+    for event, raw_query in context:
+        if event != 'end' or raw_query.tag != 'QUERY':
+            continue
         query_number = None
         query_text = None
         query_results = {}
@@ -49,24 +51,23 @@ def process_queries(xml_file, output_processed_queries, output_expected_results)
                     query_results[doc_number] = calculate_votes(doc_score)
 
         if query_number and query_text:
-            queries[int(query_number)] = {'text': query_text, 'results': query_results}
+            yield int(query_number), query_text, query_results
+        root.clear()
 
-    # Gravar consultas processadas em CSV
+def process_queries(xml_file, output_processed_queries, output_expected_results):
+    # Processar cada consulta, gravando as consultas processadas e os resultados
+    # esperados à medida que são lidas
+    logging.info("\nProcessando cada Consulta")
     logging.info("\nGravando Consultas Processadas em CSV - Arquivo %s", output_processed_queries)
-    with open(output_processed_queries, 'w') as processed_queries_file:
-        processed_queries_file.write('QueryNumber;QueryText\n')
-        for query_number, query_data in queries.items():
-            query_text = query_data['text'].replace('\n', ' ').strip().replace("    ", " ")  
-            processed_queries_file.write(f'{query_number};"{query_text}"\n')
-
-    # Resultados esperados em CSV
     logging.info("\nGravando Resultados Esperados em CSV - Arquivo %s", output_expected_results)
-    with open(output_expected_results, 'w') as expected_results_file:
+    with open(output_processed_queries, 'w') as processed_queries_file, open(output_expected_results, 'w') as expected_results_file:
+        processed_queries_file.write('QueryNumber;QueryText\n')
         expected_results_file.write('QueryNumber;DocNumber;DocScore\n')
-        for query_number, query_data in queries.items():
-            for doc_number, doc_score in query_data['results'].items():
+        for query_number, query_text, query_results in iter_queries(xml_file):
+            query_text = query_text.replace('\n', ' ').strip().replace("    ", " ")
+            processed_queries_file.write(f'{query_number};"{query_text}"\n')
+            for doc_number, doc_score in query_results.items():
                 expected_results_file.write(f'{query_number};{doc_number};{doc_score}\n')
-                
 
 def read_inverted_list_config(file_path):
     instructions = {}
@@ -76,35 +77,41 @@ def read_inverted_list_config(file_path):
             instructions[key.strip()] = value.strip()
     return instructions
 
-def process_xml_files(xml_files):
-    logging.info("\nProcessando Arquivos XML\n")
-    documents = {}
+def iter_xml_texts(xml_files):
+    # Leitura em streaming (iterparse): gera um (RECORDNUM, texto) por vez e descarta
+    # cada RECORD já processado, mantendo a memória limitada ao registro corrente
     for xml_file in xml_files:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        for record in root.findall('RECORD'):
+        context = ET.iterparse(xml_file, events=('start', 'end'))
+        event, root = next(context)
+        for event, record in context:
+            if event != 'end' or record.tag != 'RECORD':
+                continue
             record_num = int(record.find('RECORDNUM').text)
             abstract = record.find('ABSTRACT')
             extract = record.find('EXTRACT')
             abstract_text = abstract.text if abstract is not None else extract.text if extract is not None else ""
-            documents[record_num] = word_tokenize(abstract_text)
+            yield record_num, abstract_text
+            root.clear()
         logging.info("Arquivo %s Processado", xml_file)
-    return documents
 
-def generate_inverted_list(data, stop_words):
+def iter_xml_records(xml_files, analyzer):
+    # (RECORDNUM, termos): tokenização, normalização, stop words e stemming em uma só passada
+    terms = analyzer.terms
+    for record_num, abstract_text in iter_xml_texts(xml_files):
+        yield record_num, terms(abstract_text)
+
+def generate_inverted_list(data):
     logging.info("\nGerando Lista Invertida")
     inverted_list = {}
-    for record_num, abstract_text in data.items():
-        if isinstance(abstract_text, list):
-            abstract_text = ' '.join(abstract_text)  # Convertendo lista para string
-        words = abstract_text.split()
-        for word in words:
-            word = word.upper().strip(';')
-            if word not in stop_words:
-                if word not in inverted_list:
-                    inverted_list[word] = [record_num]
-                else:
-                    inverted_list[word].append(record_num)
+    # data pode ser um dicionário RECORDNUM -> termos ou o fluxo de iter_xml_records,
+    # com os termos já analisados
+    records = data.items() if isinstance(data, dict) else data
+    for record_num, terms in records:
+        for term in terms:
+            if term not in inverted_list:
+                inverted_list[term] = [record_num]
+            else:
+                inverted_list[term].append(record_num)
     return inverted_list
 
 def write_inverted_list_to_csv(inverted_list, output_file):
@@ -113,55 +120,56 @@ def write_inverted_list_to_csv(inverted_list, output_file):
         for word, doc_ids in inverted_list.items():
             csv_file.write(f'{word};{doc_ids}\n')
 
-# Função para carregar as stop words de um arquivo
-def load_stop_words(file_path):
-    with open(file_path, 'r') as file:
-        stop_words = [word.strip().upper() for word in file.readlines()]
-    return stop_words
-
-def read_inverted_list(file_path):
-    inverted_list = {}
-    with open(file_path, 'r') as file:
-        reader = csv.reader(file, delimiter=';')
-        for row in reader:
-            word = row[0]
-            doc_ids = row[1:]
-            inverted_list[word] = doc_ids
-    return inverted_list
+def build_partial_inverted_list(xml_file, analyzer):
+    # Tarefa de um processo do pool: lista invertida parcial de um único arquivo XML
+    return generate_inverted_list(iter_xml_records([xml_file], analyzer))
+
+def merge_inverted_lists(partial_lists):
+    # Merge k-way das listas parciais, na ordem dos arquivos: os termos mantêm a ordem da
+    # primeira ocorrência e os postings, ordenados por documento em cada parcial, são
+    # intercalados, reproduzindo a saída sequencial de generate_inverted_list
+    postings_by_term = {}
+    for partial in partial_lists:
+        for word, doc_ids in partial.items():
+            postings_by_term.setdefault(word, []).append(doc_ids)
+    return {word: postings[0] if len(postings) == 1 else list(heapq.merge(*postings))
+            for word, postings in postings_by_term.items()}
+
+def build_partial_inverted_lists(xml_files, analyzer, workers):
+    # Uma lista invertida parcial por arquivo, em um pool de processos se workers > 1
+    if workers <= 1:
+        return [build_partial_inverted_list(xml_file, analyzer) for xml_file in xml_files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(build_partial_inverted_list, xml_files, repeat(analyzer)))
+
+def generate_inverted_list_parallel(xml_files, analyzer, workers):
+    logging.info("\nGerando Lista Invertida em Paralelo - %s Processos", workers)
+    return merge_inverted_lists(build_partial_inverted_lists(xml_files, analyzer, workers))
 
 def process_inverted_list(inverted_list):
     logging.info("\nIndexando a Lista Invertida")
-    vector_model = {}
 
-    # Número total de documentos
-    N = len(inverted_list)
+    # Frequência de cada termo por documento, em uma única passada pelos postings
+    term_frequencies = {term: Counter(doc_ids) for term, doc_ids in inverted_list.items()}
+    return process_term_frequencies(term_frequencies)
+
+def process_term_frequencies(term_frequencies):
+    # Modelo vetorial a partir das frequências de cada termo por documento, seja da lista
+    # invertida ou dos segmentos da indexação incremental
+    vector_model = {}
 
-    # Extraindo a lista de documentos de inverted_list
-    document_list = list(set(doc_id for term_freqs in inverted_list.values() for doc_id in term_freqs))
+    # Número total de documentos distintos da coleção, contado uma única vez
+    N = len(set().union(*term_frequencies.values()))
 
     # Iterando sobre cada termo e suas frequências de documentos associadas
-    for term, term_freqs in inverted_list.items():
-        documents_occurred = list(set(term_freqs))
-        
-        idf = math.log(len(document_list) / len(documents_occurred))  # Calculating IDF
-
-        # Estrutura de dados para armazenar o peso de cada documento para o prazo atual
-        document_data = {}
-
-        # Calculando o peso de cada documento para o prazo atual
-        for document in documents_occurred:            
-            # Verificando se o documento existe na lista
-            if document in inverted_list[term]:
-                # Calculando a frequência do termo
-                tf = inverted_list[term].count(document)
-                # Normalizando  TF
-                tf_n = tf / len(inverted_list[term])
-            else:
-                # Se o documento não existir, retorne 0
-                tf_n = 0
-        
-            weight = tf_n * idf  # Calculando o peso
-            document_data[document] = weight
+    for term, frequencies in term_frequencies.items():
+        idf = math.log(N / len(frequencies))  # Calculating IDF
+
+        # TF normalizado pelo total de ocorrências do termo
+        total_occurrences = sum(frequencies.values())
+
+        # Calculando o peso de cada documento para o termo atual
+        document_data = {document: (tf / total_occurrences) * idf for document, tf in frequencies.items()}
 
         # Armazenando IDF e pesos de documentos para o termo atual no modelo
         vector_model[term] = (idf, document_data)
@@ -169,14 +177,29 @@ def process_inverted_list(inverted_list):
     logging.info("\nIndexador Segundo o Modelo Vetorial Gerado")
     return vector_model
 
-def write_vector_model(vector_model, output_file):
-    field_names = ['word', 'data']
+def write_vector_model(vector_model, output_file, term_upper_bounds=None):
+    field_names = ['word', 'data', 'max_score']
     with open(output_file, 'w+') as csv_file:
         writer = csv.DictWriter(csv_file, delimiter=';', lineterminator='\n', fieldnames=field_names)
         writer.writeheader()
 
         for term, (idf, document_data) in vector_model.items():
-            writer.writerow({'word': term, 'data': document_data})
+            max_score = term_upper_bounds[term] if term_upper_bounds is not None else ''
+            writer.writerow({'word': term, 'data': document_data, 'max_score': max_score})
+
+def compute_document_norms(vector_model):
+    # Norma de cada documento calculada uma única vez, na indexação
+    squared_weights = {}
+    for term, (idf, document_data) in vector_model.items():
+        for document, weight in document_data.items():
+            squared_weights[document] = squared_weights.get(document, 0) + weight ** 2
+    return {document: sqrt(total) for document, total in squared_weights.items()}
+
+def write_document_norms(document_norms, output_file):
+    with open(output_file, 'w') as csv_file:
+        csv_file.write('DocID;Norm\n')
+        for document, norm in sorted(document_norms.items()):
+            csv_file.write(f'{document};{norm!r}\n')
 
 def load_inverted_list(file_path):
     logging.info("\nCarregando Lista Invertida - Leitura do CSV")
@@ -190,82 +213,6 @@ def load_inverted_list(file_path):
             inverted_list[word] = doc_ids
     return inverted_list
 
-def load_vector_model(file_path):
-    logging.info("\nCarregando Modelo Vetorial - Leitura CSV")
-    vector_model = defaultdict(list)
-    
-    with open(file_path, 'r') as file:
-        next(file) 
-        
-        for line in file:
-            # Divide a linha em palavra e dados
-            word, data_str = line.strip().split(';')
-            
-            # Converte a string de dados em um dicionário usando literal_eval
-            data = literal_eval(data_str)
-            
-            # Adiciona cada termo e peso à lista correspondente à classe no dicionário
-            for doc_id, weight in data.items():
-                vector_model[doc_id].append((word, weight))
-    return vector_model
-
-def load_queries(file_path):
-    logging.info("\nCarregando Consultas (Queries) - Leitura CSV")
-    queries = defaultdict(list)
-    with open(file_path, 'r') as file:
-        # Ler linhas do arquivo
-        lines = file.readlines()
-        
-        # Iterar sobre as linhas para extrair as consultas
-        i = 1  # Começar a partir da segunda linha, ignorando o cabeçalho
-        while i < len(lines):
-            line = lines[i].strip()  
-            if line:  # Verificar se a linha não está vazia
-                # Verificar se a próxima linha começa com espaços em branco, indicando uma continuação
-                while i + 1 < len(lines) and lines[i + 1].startswith(' '):
-                    # Adicionar a linha atual à próxima linha e remover espaços em branco no início
-                    line += lines[i + 1].lstrip()
-                    i += 1  
-                    
-                # Dividir a linha em duas partes no primeiro ponto e vírgula encontrado
-                parts = line.split(';', 1)
-                
-                # Verificar se a linha foi dividida corretamente
-                if len(parts) == 2:
-                    query_number = int(parts[0].strip())  # Extrair o número da consulta e remover espaços em branco
-                    query_text = parts[1].strip().strip('"').split()  # Extrair o texto da consulta e remover espaços em branco
-                    
-                    # Adicionar as palavras da consulta à lista de consultas correspondente ao número
-                    queries[query_number] = query_text
-                else:
-                    print(f"Erro na linha: {line}")
-            i += 1  
-    return queries
-
-def calculate_similarity(query, doc_vector):
-    doc_vector = dict(doc_vector)
-    if isinstance(doc_vector, dict):
-        dot_product = sum((1 if word in query else 0) * weight for word, weight in doc_vector.items())
-        query_magnitude = sqrt(len(query))  # Considerando o tamanho da lista como magnitude
-        doc_magnitude = sqrt(sum(weight ** 2 for word, weight in doc_vector.items()))
-        if query_magnitude == 0 or doc_magnitude == 0:
-            return 0
-        similarity = dot_product / (query_magnitude * doc_magnitude)
-        return similarity
-    return 0
-
-def perform_search(vector_model, queries):
-    logging.info("\nRealizando a Busca - Resposta Encontrada p/ Consulta")
-    search_results = []
-    for i, query in enumerate(queries, start=1):
-        query_results = []
-        for doc_id, doc_vector in vector_model.items():
-            similarity = calculate_similarity(queries[query], doc_vector)
-            query_results.append((similarity, doc_id))
-        query_results.sort(reverse=True) 
-        search_results.append((i, query_results))
-    return search_results
-
 def write_search_results(results, output_file):
     with open(output_file, 'w', newline='') as csvfile:
         csv_writer = csv.writer(csvfile, delimiter=';')
@@ -276,8 +223,40 @@ def write_search_results(results, output_file):
                 csv_writer.writerow([query_id, doc_id_str])
               
 
+class BackgroundWriter:
+    # Gravação dos artefatos do modo fundido por uma única thread, na ordem de submissão.
+    # As estruturas gravadas não são modificadas pelas etapas seguintes.
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gravacao')
+        self.pending = []
+
+    def submit(self, function, *args):
+        self.pending.append(self.executor.submit(function, *args))
+
+    def wait(self):
+        self.executor.shutdown(wait=True)
+        for future in self.pending:
+            future.result()  # Relança erros de gravação
+
 def main():
     logging.info("\nIniciando Implementação do Sistema de Recuperação em Memória Segundo Modelo Vetorial.")
+
+    # Instrumentação opcional (execucao.cfg): temporizadores e contadores nas funções principais
+    current_directory = os.getcwd()
+    run_config_file = os.path.join(current_directory, 'src', 'execucao.cfg')
+    run_config = read_configuration_file(run_config_file) if os.path.exists(run_config_file) else {}
+    instrumentation = start_instrumentation(run_config, {'main': sys.modules[__name__], 'buscador': buscador,
+                                                         'analisador': analisador, 'indice_compacto': indice_compacto})
+
+    # Modo fundido (MODO=FUNDIDO): lista invertida e modelo vetorial passam direto da memória
+    # para o Indexador e o Buscador; os CSVs intermediários são gravados em segundo plano
+    # (GRAVAR_CSV=SIM) ou omitidos (GRAVAR_CSV=NAO)
+    fused = run_config.get('MODO', 'ETAPAS') == 'FUNDIDO'
+    background_writer = None
+    if fused:
+        logging.info("\nModo Fundido - Sem Releitura dos CSVs Intermediários")
+        if run_config.get('GRAVAR_CSV', 'SIM') == 'SIM':
+            background_writer = BackgroundWriter()
     
     logging.info("\n\n\n-------------------------------------------------------------------------\n\n")
     
@@ -300,6 +279,8 @@ def main():
     end_time = time.time()
     execution_time = end_time - start_time
     logging.info("\nTempo de Execução: %s segundos", math.ceil(execution_time))
+    if instrumentation is not None:
+        instrumentation.record_stage('consultas', execution_time)
     logging.info("\nFim Módulo Processador de Consultas")
     
     logging.info("\n\n\n-------------------------------------------------------------------------\n\n")
@@ -313,22 +294,58 @@ def main():
     inverted_list_config = read_inverted_list_config(os.path.join(current_directory, 'src', inverted_list_config_file))
     xml_files = inverted_list_config['LEIA'].split(', ')
     output_file = inverted_list_config['ESCREVA']
+    workers = int(inverted_list_config.get('PROCESSOS', 1))
 
-    xml_data = process_xml_files([os.path.join(current_directory, file) for file in xml_files])
-    
     logging.info("\nCarregando lista de Stop Words")
     # Carregar stop words
     stop_words = load_stop_words(os.path.join(current_directory, 'stopwords.txt'))
     logging.info("\n%s Stop Words Carregadas", len(stop_words))
-    
-    inverted_list = generate_inverted_list(xml_data, stop_words)
-    logging.info("\nGravando Lista Invertida em CSV - Arquivo %s", os.path.join(current_directory, output_file))
-    write_inverted_list_to_csv(inverted_list, os.path.join(current_directory, output_file))
+    # Analisador de documentos e consultas; config.txt define se os termos são reduzidos ao radical
+    analyzer = load_analyzer(current_directory, stop_words)
+    logging.info("\nAnalisador %s", 'com Stemmer' if analyzer.stemming else 'sem Stemmer')
+
+    logging.info("\nProcessando Arquivos XML\n")
+    xml_paths = [os.path.join(current_directory, file) for file in xml_files]
+    positional_builder = None
+    if 'POSICOES' in inverted_list_config:
+        from posicional import PositionalIndexBuilder
+        positional_builder = PositionalIndexBuilder()
+    if 'SEGMENTOS' in inverted_list_config:
+        # Indexação incremental: apenas arquivos novos ou alterados são lidos novamente
+        segment_dir = os.path.join(current_directory, inverted_list_config['SEGMENTOS'])
+        segments = update_segments(xml_paths, segment_dir,
+                                   lambda changed_files: build_partial_inverted_lists(changed_files, analyzer, workers),
+                                   analyzer.signature(), current_directory)
+        inverted_list = inverted_list_from_segments(segments)
+    elif workers > 1:
+        # Cada processo lê e tokeniza um arquivo; as listas parciais são intercaladas ao final
+        inverted_list = generate_inverted_list_parallel(xml_paths, analyzer, workers)
+    else:
+        # Os registros são lidos em streaming e alimentam a lista invertida diretamente
+        records = iter_xml_records(xml_paths, analyzer)
+        if positional_builder is not None:
+            # As posições são registradas na mesma passada que alimenta a lista invertida
+            records = positional_builder.observe(records)
+        inverted_list = generate_inverted_list(records)
+    if positional_builder is not None:
+        if 'SEGMENTOS' in inverted_list_config or workers > 1:
+            # Segmentos e processos produzem apenas frequências: as posições exigem uma passada própria
+            positional_builder.consume(iter_xml_records(xml_paths, analyzer))
+        logging.info("\nGravando Índice Posicional - Arquivo %s", os.path.join(current_directory, inverted_list_config['POSICOES']))
+        positional_builder.write(os.path.join(current_directory, inverted_list_config['POSICOES']))
+    if not fused:
+        logging.info("\nGravando Lista Invertida em CSV - Arquivo %s", os.path.join(current_directory, output_file))
+        write_inverted_list_to_csv(inverted_list, os.path.join(current_directory, output_file))
+    elif background_writer is not None:
+        logging.info("\nGravando Lista Invertida em CSV em Segundo Plano - Arquivo %s", os.path.join(current_directory, output_file))
+        background_writer.submit(write_inverted_list_to_csv, inverted_list, os.path.join(current_directory, output_file))
     
     # Registra o tempo de término
     end_time = time.time()
     execution_time = end_time - start_time
     logging.info("\nTempo de Execução: %s segundos", math.ceil(execution_time))
+    if instrumentation is not None:
+        instrumentation.record_stage('lista_invertida', execution_time)
     logging.info("\nFim Módulo Gerador Lista Invertida")
     
     logging.info("\n\n\n-------------------------------------------------------------------------\n\n")
@@ -345,17 +362,61 @@ def main():
 
     inverted_list_file = index_config['LEIA']
     output_file = index_config['ESCREVA']
-
-    inverted_list = load_inverted_list(os.path.join(current_directory, inverted_list_file))
-    
-    # Indexar a lista invertida e salvar o modelo vetorial
-    vector_model_index = process_inverted_list(inverted_list)
-    logging.info("\nGravando Modelo Vetorial em CSV - Arquivo %s", os.path.join(current_directory, output_file))
-    write_vector_model(vector_model_index, os.path.join(current_directory, output_file))
+    norms_file = index_config['NORMAS']
+
+    compress = index_config.get('COMPRIMIR', 'NAO') == 'SIM'
+    if fused:
+        # A lista invertida do Gerador é indexada diretamente, sem releitura do CSV
+        vector_model_index = process_inverted_list(inverted_list)
+    elif 'SEGMENTOS' in index_config:
+        # Indexação incremental: IDF e pesos recalculados das frequências guardadas nos segmentos,
+        # sem reler a lista invertida em CSV
+        logging.info("\nCarregando Segmentos - Diretório %s", os.path.join(current_directory, index_config['SEGMENTOS']))
+        segments = load_segments(os.path.join(current_directory, index_config['SEGMENTOS']))
+        logging.info("\nIndexando os Segmentos")
+        vector_model_index = process_term_frequencies(merge_segments(segments))
+        inverted_list = inverted_list_from_segments(segments) if compress else None
+    else:
+        inverted_list = load_inverted_list(os.path.join(current_directory, inverted_list_file))
+
+        # Indexar a lista invertida e salvar o modelo vetorial
+        vector_model_index = process_inverted_list(inverted_list)
+    document_norms = compute_document_norms(vector_model_index)
+    term_upper_bounds = compute_term_upper_bounds(
+        {term: document_data.items() for term, (idf, document_data) in vector_model_index.items()}, document_norms)
+    if not fused:
+        logging.info("\nGravando Modelo Vetorial em CSV - Arquivo %s", os.path.join(current_directory, output_file))
+        write_vector_model(vector_model_index, os.path.join(current_directory, output_file), term_upper_bounds)
+        logging.info("\nGravando Normas dos Documentos em CSV - Arquivo %s", os.path.join(current_directory, norms_file))
+        write_document_norms(document_norms, os.path.join(current_directory, norms_file))
+        if 'INDICE' in index_config:
+            logging.info("\nGravando Índice Binário - Arquivo %s", os.path.join(current_directory, index_config['INDICE']))
+            # COMPRIMIR=SIM grava os postings como gaps e frequências em variable-byte
+            write_binary_index(vector_model_index, document_norms, term_upper_bounds, os.path.join(current_directory, index_config['INDICE']),
+                               inverted_list if compress else None)
+            if 'FRAGMENTOS' in index_config:
+                # Índice fragmentado por faixas de DocID, um índice binário por fragmento
+                from fragmentos import write_shards
+                logging.info("\nGravando %s Fragmentos do Índice", index_config['FRAGMENTOS'])
+                write_shards(vector_model_index, document_norms, os.path.join(current_directory, index_config['INDICE']),
+                             int(index_config['FRAGMENTOS']))
+    elif background_writer is not None:
+        logging.info("\nGravando Modelo Vetorial, Normas e Índice em Segundo Plano")
+        background_writer.submit(write_vector_model, vector_model_index, os.path.join(current_directory, output_file), term_upper_bounds)
+        background_writer.submit(write_document_norms, document_norms, os.path.join(current_directory, norms_file))
+        if 'INDICE' in index_config:
+            background_writer.submit(write_binary_index, vector_model_index, document_norms, term_upper_bounds,
+                                     os.path.join(current_directory, index_config['INDICE']), inverted_list if compress else None)
+            if 'FRAGMENTOS' in index_config:
+                from fragmentos import write_shards
+                background_writer.submit(write_shards, vector_model_index, document_norms,
+                                         os.path.join(current_directory, index_config['INDICE']), int(index_config['FRAGMENTOS']))
     # Registra o tempo de término
     end_time = time.time()
     execution_time = end_time - start_time
     logging.info("\nTempo de Execução: %s segundos", math.ceil(execution_time))
+    if instrumentation is not None:
+        instrumentation.record_stage('indexador', execution_time)
     logging.info("\nFim Módulo Indexador")
     
     logging.info("\n\n\n-------------------------------------------------------------------------\n\n")
@@ -369,18 +430,58 @@ def main():
     search_config_file = 'busca.cfg'
     search_config = read_configuration_file(os.path.join(current_directory, 'src', search_config_file))
 
-    vector_model_file = search_config['MODELO']
     queries_file = search_config['CONSULTAS']
     results_file = search_config['RESULTADOS']
-
-    # Carregar modelo vetorial
-    vector_model = load_vector_model(os.path.join(current_directory, vector_model_file))
+    # Profundidade do ranking: 0 grava todos os documentos, k > 0 apenas os k melhores
+    depth = int(search_config.get('PROFUNDIDADE', 0))
+
+    sharded = 'FRAGMENTOS' in search_config and not fused
+    if sharded:
+        # A busca fragmentada usa apenas o algoritmo por consulta, sem cache nem índice posicional
+        ignored = [key for key in ('CACHE', 'POSICOES') if key in search_config]
+        if search_config.get('LOTE', 'NAO') == 'SIM':
+            ignored.append('LOTE')
+        for key in ignored:
+            logging.warning("\nInstrução %s de busca.cfg Ignorada com FRAGMENTOS", key)
+    positional = None
+    query_analyzer = analyzer
+    if 'POSICOES' in search_config and not sharded:
+        # Índice posicional: consultas com operadores de frase e proximidade
+        from posicional import PositionalQueryAnalyzer, load_positional_search
+        positional = load_positional_search(search_config, current_directory)
+        query_analyzer = PositionalQueryAnalyzer(analyzer)
 
     # Carregar consultas
-    queries = load_queries(os.path.join(current_directory, queries_file))
+    queries = load_queries(os.path.join(current_directory, queries_file), query_analyzer)
+
+    if not sharded:
+        # Carregar modelo vetorial (no modo fundido, o modelo do Indexador já está em memória)
+        if fused:
+            postings, document_norms, term_upper_bounds, term_rank = search_model_from_vector_model(
+                vector_model_index, document_norms, term_upper_bounds)
+        else:
+            postings, document_norms, term_upper_bounds, term_rank = load_search_model(search_config, current_directory)
 
     # Realizar busca
-    search_results = perform_search(vector_model, queries)
+    if sharded:
+        # Cada fragmento do índice é pesquisado por um processo; os rankings parciais são intercalados
+        from fragmentos import open_sharded_search
+        with open_sharded_search(os.path.join(current_directory, search_config['INDICE']),
+                                 int(search_config['FRAGMENTOS'])) as sharded_search:
+            search_results = sharded_search.search(queries, depth)
+    elif search_config.get('LOTE', 'NAO') == 'SIM' and positional is None:
+        # Todas as consultas em um único produto de matrizes esparsas (requer scipy)
+        from busca_lote import batch_search, build_document_matrix
+        search_results = batch_search(build_document_matrix(postings, document_norms), queries, depth)
+    else:
+        cache = None
+        if 'CACHE' in search_config:
+            # Cache LRU de resultados; o modelo não muda durante a busca em lote
+            cache = QueryResultCache(int(search_config['CACHE']))
+        search_results = perform_search(postings, document_norms, queries, depth, term_upper_bounds, term_rank, cache,
+                                        positional)
+        if cache is not None:
+            logging.info("\nCache de Consultas: %s", cache.stats())
 
     # Escrever resultados
     logging.info("\nGravando RESULTADOS em CSV")
@@ -389,7 +490,16 @@ def main():
     end_time = time.time()
     execution_time = end_time - start_time
     logging.info("\nTempo de Execução: %s segundos", math.ceil(execution_time))
+    if instrumentation is not None:
+        instrumentation.record_stage('busca', execution_time)
     logging.info("\nFim Módulo Buscador\n\n\n")
+
+    if background_writer is not None:
+        logging.info("\nAguardando Gravação dos Artefatos em Segundo Plano")
+        background_writer.wait()
+
+    if instrumentation is not None:
+        instrumentation.finish(os.path.join(current_directory, run_config.get('RELATORIO', 'RESULT\\instrumentacao.json')))
     
 
 if __name__ == "__main__":
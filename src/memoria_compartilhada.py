@@ -0,0 +1,152 @@
+import logging
+import os
+import signal
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import buscador
+from indice_binario import HEADER, MAGIC, BinaryIndex, encode_binary_index
+from indice_compacto import load_compact_index
+
+# Modelo vetorial em memória compartilhada para vários processos do Buscador. Um único
+# processo publicador carrega o modelo (índice binário de INDICE ou CSVs de MODELO e NORMAS)
+# e o copia, no formato do índice binário, para um segmento de multiprocessing.shared_memory.
+# Cada Buscador anexa o segmento somente para leitura: dicionário de termos, postings e
+# normas são visões NumPy do segmento, sem cópia e sem etapa de parse, de modo que um
+# processo a mais quase não acrescenta memória privada.
+#
+# Uso: python src/memoria_compartilhada.py  (publica o modelo de busca.cfg até Ctrl+C)
+#
+# busca.cfg: MEMORIA_COMPARTILHADA=nome do segmento. O Buscador e o servidor anexam o
+# segmento se ele estiver publicado e, caso contrário, carregam o modelo por conta própria.
+# O publicador deve permanecer em execução (no Windows o segmento deixa de existir com ele)
+# e ser reiniciado quando o modelo vetorial mudar.
+#
+# O segmento começa pela impressão digital dos arquivos de origem do modelo (data de
+# modificação e tamanho de INDICE, ou de MODELO e NORMAS), seguida do índice binário:
+#   arquivos         uint64               número de arquivos de origem
+#   impressão        uint64[arquivos, 2]  (st_mtime_ns, st_size) de cada arquivo
+# Um Buscador cujos arquivos não têm a mesma impressão do segmento carrega o modelo dos
+# arquivos: o segmento de um publicador não reiniciado nunca é usado com um modelo novo.
+FINGERPRINT_ENTRY = struct.Struct('<2Q')
+FINGERPRINT_COUNT = struct.Struct('<Q')
+
+def source_files(search_config, current_directory):
+    # Arquivos dos quais o modelo do segmento é carregado
+    names = ['INDICE'] if 'INDICE' in search_config else ['MODELO', 'NORMAS']
+    return [os.path.join(current_directory, search_config[name]) for name in names]
+
+def source_fingerprint(files):
+    return tuple((status.st_mtime_ns, status.st_size) for status in map(os.stat, files))
+
+def encode_fingerprint(fingerprint):
+    return FINGERPRINT_COUNT.pack(len(fingerprint)) + b''.join(FINGERPRINT_ENTRY.pack(*entry) for entry in fingerprint)
+
+def decode_fingerprint(buffer):
+    # (impressão, tamanho em bytes); None se o segmento não comporta a impressão indicada
+    count, = FINGERPRINT_COUNT.unpack_from(buffer)
+    size = FINGERPRINT_COUNT.size + count * FINGERPRINT_ENTRY.size
+    if size + HEADER.size > len(buffer):
+        return None, size
+    return tuple(FINGERPRINT_ENTRY.unpack_from(buffer, FINGERPRINT_COUNT.size + i * FINGERPRINT_ENTRY.size)
+                 for i in range(count)), size
+
+def encode_search_model(search_config, current_directory):
+    # Conteúdo do segmento: o arquivo do índice binário como está, ou o modelo lido dos CSVs
+    # codificado no mesmo formato
+    if 'INDICE' in search_config:
+        with open(os.path.join(current_directory, search_config['INDICE']), 'rb') as file:
+            data = file.read()
+        return [data[:HEADER.size], data[HEADER.size:]]
+    index = load_compact_index(os.path.join(current_directory, search_config['MODELO']),
+                                    os.path.join(current_directory, search_config['NORMAS']))
+    return encode_binary_index(buscador.snapshot_vector_model(index), index.document_norms, index.term_upper_bounds)
+
+def publish_index(chunks, name, fingerprint):
+    # Cria o segmento e copia a impressão digital e o índice. O cabeçalho do índice é copiado
+    # por último e a assinatura por último no cabeçalho: um processo que anexe o segmento
+    # durante a cópia não o reconhece como índice e carrega o modelo por conta própria
+    prefix = encode_fingerprint(fingerprint)
+    size = len(prefix) + sum(len(chunk) for chunk in chunks)
+    try:
+        shared_memory = SharedMemory(name, create=True, size=size)
+    except FileExistsError:
+        # Segmento deixado por um publicador encerrado sem removê-lo: removido e recriado
+        logging.warning("\nMemória Compartilhada %s Já Existente - Segmento Anterior Removido", name)
+        stale = SharedMemory(name)
+        stale.close()
+        stale.unlink()
+        shared_memory = SharedMemory(name, create=True, size=size)
+    shared_memory.buf[:len(prefix)] = prefix
+    offset = len(prefix) + len(chunks[0])
+    for chunk in chunks[1:]:
+        shared_memory.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    header = len(prefix)
+    shared_memory.buf[header + len(MAGIC):header + len(chunks[0])] = chunks[0][len(MAGIC):]
+    shared_memory.buf[header:header + len(MAGIC)] = chunks[0][:len(MAGIC)]
+    return shared_memory
+
+class AttachedSegment(SharedMemory):
+    # Segmento anexado por um Buscador. Não fica registrado no resource_tracker deste processo,
+    # que o removeria ao fim do Buscador (quem remove o segmento é o publicador), e não é
+    # fechado pelo coletor de lixo: as visões NumPy do índice usam o buffer até o fim do processo
+
+    def __init__(self, name):
+        super().__init__(name)
+        if os.name == 'posix':
+            resource_tracker.unregister(self._name, 'shared_memory')
+
+    def __del__(self):
+        pass
+
+def attach_shared_index(name, expected_fingerprint=None):
+    # Índice sobre o segmento publicado, somente leitura; None se ele não existe, ainda está
+    # sendo copiado ou foi publicado a partir de arquivos diferentes de expected_fingerprint
+    try:
+        shared_memory = AttachedSegment(name)
+    except FileNotFoundError:
+        return None
+    fingerprint, offset = decode_fingerprint(shared_memory.buf)
+    if fingerprint is None or bytes(shared_memory.buf[offset:offset + len(MAGIC)]) != MAGIC:
+        shared_memory.close()
+        return None
+    if expected_fingerprint is not None and fingerprint != expected_fingerprint:
+        logging.warning("\nMemória Compartilhada %s Desatualizada - Os Arquivos do Modelo Mudaram Após a Publicação", name)
+        shared_memory.close()
+        return None
+    index = BinaryIndex(shared_memory.buf[offset:].toreadonly())
+    # Referência ao segmento, que permanece mapeado até o fim do processo
+    index.shared_memory = shared_memory
+    return index
+
+def main_publisher():
+    logging.info("\nInício Publicação do Modelo Vetorial em Memória Compartilhada")
+    current_directory = os.getcwd()
+    logging.info("\nLeitura do arquivo de configurações - busca.cfg")
+    search_config = buscador.read_configuration_file(os.path.join(current_directory, 'src', 'busca.cfg'))
+    name = search_config['MEMORIA_COMPARTILHADA']
+
+    start_time = time.time()
+    # A impressão é lida antes do modelo: uma alteração durante a leitura invalida o segmento
+    fingerprint = source_fingerprint(source_files(search_config, current_directory))
+    shared_memory = publish_index(encode_search_model(search_config, current_directory), name, fingerprint)
+    logging.info("\nModelo Vetorial Publicado em %.3f segundos - Memória Compartilhada %s, %s bytes",
+                 time.time() - start_time, name, shared_memory.size)
+
+    # SIGTERM encerra o publicador como Ctrl+C, removendo o segmento
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+        logging.info("\nMemória Compartilhada %s Removida", name)
+
+if __name__ == "__main__":
+    main_publisher()
@@ -0,0 +1,318 @@
+import logging
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left
+from functools import lru_cache
+from math import inf, sqrt
+import numpy as np
+import buscador
+from compressao import decode_varbyte, encode_varbyte, intersect
+
+# Índice posicional opcional: para cada termo, os documentos em que ele ocorre e, em cada
+# documento, as posições do termo no texto analisado (sem stop words e pontuação, como
+# nas consultas). DocIDs e frequências ficam em arrays de inteiros; as posições de cada
+# documento são gravadas como diferenças em variable-byte (ver compressao.py).
+#
+# Operadores de consulta sobre o índice:
+#   "termo1 termo2"     frase: os termos em posições consecutivas, nessa ordem
+#   "termo1 termo2"~k   proximidade: os termos distintos em uma janela de até n + k posições
+# Os documentos candidatos vêm da interseção conjuntiva dos postings dos termos no modelo
+# vetorial (compressao.intersect), e só as posições desses documentos são decodificadas.
+# Os documentos que satisfazem os operadores são ordenados pelo cosseno de todos os termos
+# da consulta.
+#
+# Com PROXIMIDADE=p em busca.cfg, o cosseno de cada documento com m >= 2 termos distintos
+# da consulta é multiplicado por 1 + p * m / janela, onde janela é a menor sequência de
+# posições que contém os m termos (termos adjacentes: 1 + p).
+#
+# gli.cfg:   POSICOES=RESULT\posicoes.bin grava o índice posicional
+# busca.cfg: POSICOES=RESULT\posicoes.bin e PROXIMIDADE=0.0 (opcional)
+#
+# Layout: cabeçalho, termos ordenados separados por '\n', deslocamento de cada termo e, por
+# termo: n_docs (u4), DocIDs (i4), frequências (u4), deslocamento das posições de cada
+# documento (u4, n_docs + 1) e as posições comprimidas.
+MAGIC = b'POSICOES'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+OPERATOR = re.compile(r'"([^"]*)"(?:~(\d+))?')
+# Com PROXIMIDADE, o top-k é escolhido entre os RERANK_DEPTH melhores documentos pelo cosseno
+RERANK_DEPTH = 100
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+class PositionalIndexBuilder:
+    def __init__(self):
+        self.positions = {}  # termo -> {DocID: [posições]}
+
+    def add(self, record_num, terms):
+        positions = self.positions
+        for position, term in enumerate(terms):
+            documents = positions.get(term)
+            if documents is None:
+                positions[term] = {record_num: [position]}
+            elif record_num in documents:
+                documents[record_num].append(position)
+            else:
+                documents[record_num] = [position]
+
+    def observe(self, records):
+        # Registra as posições e repassa os registros (mesma passada da lista invertida)
+        for record_num, terms in records:
+            self.add(record_num, terms)
+            yield record_num, terms
+
+    def consume(self, records):
+        for record_num, terms in records:
+            self.add(record_num, terms)
+
+    def write(self, output_file):
+        write_positional_index(self.positions, output_file)
+
+def encode_term(documents):
+    doc_ids = sorted(documents)
+    frequencies = []
+    position_offsets = [0]
+    positions = bytearray()
+    for doc_id in doc_ids:
+        previous = 0
+        for position in documents[doc_id]:
+            encode_varbyte(position - previous, positions)
+            previous = position
+        frequencies.append(len(documents[doc_id]))
+        position_offsets.append(len(positions))
+    blob = (struct.pack('<I', len(doc_ids)) + np.asarray(doc_ids, dtype='<i4').tobytes()
+            + np.asarray(frequencies, dtype='<u4').tobytes() + np.asarray(position_offsets, dtype='<u4').tobytes()
+            + bytes(positions))
+    return blob + b'\0' * (_align(len(blob), 4) - len(blob))
+
+def write_positional_index(positions, output_file):
+    terms = sorted(positions, key=lambda term: term.encode('utf-8'))
+    dictionary = '\n'.join(terms).encode('utf-8')
+    blobs = [encode_term(positions[term]) for term in terms]
+    offsets = np.zeros(len(terms) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    # Gravado à parte e renomeado, como o índice binário: um Buscador com o arquivo anterior
+    # mapeado não o vê mudar
+    temporary_file = output_file + '.tmp'
+    with open(temporary_file, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(terms), len(dictionary)))
+        file.write(dictionary + b'\0' * (_align(len(dictionary)) - len(dictionary)))
+        file.write(offsets.tobytes())
+        for blob in blobs:
+            file.write(blob)
+    os.replace(temporary_file, output_file)
+
+class PositionalPostings:
+    # Postings posicionais de um termo; as posições de cada documento são decodificadas sob demanda
+    __slots__ = ('buffer', 'doc_ids', 'frequencies', 'position_offsets', 'positions_start')
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        n_docs = struct.unpack_from('<I', buffer, offset)[0]
+        offset += 4
+        self.doc_ids = np.frombuffer(buffer, dtype='<i4', count=n_docs, offset=offset).tolist()
+        offset += 4 * n_docs
+        self.frequencies = np.frombuffer(buffer, dtype='<u4', count=n_docs, offset=offset).tolist()
+        offset += 4 * n_docs
+        self.position_offsets = np.frombuffer(buffer, dtype='<u4', count=n_docs + 1, offset=offset).tolist()
+        self.positions_start = offset + 4 * (n_docs + 1)
+
+    def find(self, doc_id):
+        # Posição do documento nos postings, ou -1
+        i = bisect_left(self.doc_ids, doc_id)
+        return i if i < len(self.doc_ids) and self.doc_ids[i] == doc_id else -1
+
+    def positions(self, i):
+        positions = []
+        offset = self.positions_start + self.position_offsets[i]
+        position = 0
+        for _ in range(self.frequencies[i]):
+            gap, offset = decode_varbyte(self.buffer, offset)
+            position += gap
+            positions.append(position)
+        return positions
+
+class PositionalIndex:
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        magic, version, n_terms, n_dictionary_bytes = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Arquivo não está no formato do índice posicional')
+        offset = HEADER.size
+        dictionary = bytes(self.buffer[offset:offset + n_dictionary_bytes]).decode('utf-8')
+        self.term_ids = {term: i for i, term in enumerate(dictionary.split('\n'))} if n_terms else {}
+        offset += _align(n_dictionary_bytes)
+        self.offsets = np.frombuffer(self.buffer, dtype='<u8', count=n_terms + 1, offset=offset)
+        self.blobs_start = offset + 8 * (n_terms + 1)
+        # Os postings de um termo são decodificados uma vez e reaproveitados entre consultas
+        self.term_postings = lru_cache(maxsize=4096)(self.decode_postings)
+
+    def decode_postings(self, term_id):
+        return PositionalPostings(self.buffer, self.blobs_start + int(self.offsets[term_id]))
+
+    def postings(self, term):
+        term_id = self.term_ids.get(term)
+        return None if term_id is None else self.term_postings(term_id)
+
+    def matches(self, doc_id, terms, slop):
+        # Os termos formam a frase (slop None) ou ficam a até slop posições no documento
+        if slop is not None:
+            terms = list(dict.fromkeys(terms))
+        positions = []
+        for term in terms:
+            posting = self.postings(term)
+            i = -1 if posting is None else posting.find(doc_id)
+            if i < 0:
+                return False
+            positions.append(posting.positions(i))
+        if slop is None:
+            return is_phrase(positions)
+        return minimum_window(positions) <= len(positions) + slop
+
+def open_positional_index(file_path):
+    with open(file_path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return PositionalIndex(buffer)
+
+def is_phrase(positions):
+    # Existe p tal que o i-ésimo termo ocorre na posição p + i
+    starts = set(positions[0])
+    for i, term_positions in enumerate(positions[1:], start=1):
+        starts.intersection_update([position - i for position in term_positions])
+        if not starts:
+            return False
+    return True
+
+def minimum_window(positions):
+    # Menor número de posições consecutivas que contém ao menos uma ocorrência de cada lista
+    events = sorted((position, i) for i, term_positions in enumerate(positions) for position in term_positions)
+    counts = [0] * len(positions)
+    covered = 0
+    best = inf
+    start = 0
+    for position, i in events:
+        if counts[i] == 0:
+            covered += 1
+        counts[i] += 1
+        while covered == len(positions):
+            first_position, j = events[start]
+            best = min(best, position - first_position + 1)
+            counts[j] -= 1
+            if counts[j] == 0:
+                covered -= 1
+            start += 1
+    return best
+
+class PositionalQuery(list):
+    # Termos da consulta (o cosseno usa todos) e operadores: (termos, folga), folga None para frase
+    def __init__(self, terms, constraints=()):
+        super().__init__(terms)
+        self.constraints = tuple(constraints)
+
+class PositionalQueryAnalyzer:
+    # Analisa o texto fora e dentro dos operadores com o analisador dos documentos
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def terms(self, text):
+        terms = []
+        constraints = []
+        position = 0
+        for match in OPERATOR.finditer(text):
+            terms += self.analyzer.terms(text[position:match.start()])
+            operator_terms = self.analyzer.terms(match.group(1))
+            terms += operator_terms
+            if len(operator_terms) > 1:
+                constraints.append((tuple(operator_terms), None if match.group(2) is None else int(match.group(2))))
+            position = match.end()
+        terms += self.analyzer.terms(text[position:])
+        return PositionalQuery(terms, constraints)
+
+def score_documents(postings, document_norms, query, term_rank, documents):
+    # Cosseno apenas dos documentos candidatos, com a soma na ordem do modelo vetorial
+    # (os mesmos escores de score_query); candidatos de escore zero ficam ao final
+    query_magnitude = sqrt(len(query))
+    accumulators = dict.fromkeys(documents, 0)
+    for word in sorted((word for word in set(query) if word in postings), key=term_rank.get):
+        doc_ids, weights = buscador.posting_arrays(postings[word])
+        for doc_id in documents:
+            i = bisect_left(doc_ids, doc_id)
+            if i < len(doc_ids) and doc_ids[i] == doc_id:
+                accumulators[doc_id] += weights[i]
+
+    query_results = []
+    zero_results = []
+    for doc_id, dot_product in accumulators.items():
+        doc_magnitude = document_norms[doc_id]
+        if dot_product and doc_magnitude:
+            query_results.append((dot_product / (query_magnitude * doc_magnitude), doc_id))
+        else:
+            zero_results.append((0 if doc_magnitude == 0 else 0.0, doc_id))
+    query_results.sort(reverse=True)
+    zero_results.sort(key=lambda result: result[1], reverse=True)
+    return query_results + zero_results
+
+class PositionalSearch:
+    def __init__(self, index, boost=0.0):
+        self.index = index
+        self.boost = boost
+
+    def search(self, postings, document_norms, query, term_rank, term_upper_bounds, depth, zero_similarities=None):
+        constraints = getattr(query, 'constraints', ())
+        if constraints:
+            documents = self.matching_documents(postings, term_rank, constraints)
+            query_results = score_documents(postings, document_norms, query, term_rank, documents)
+            if depth > 0:
+                # Como em score_query_top_k, o top-k só tem documentos de similaridade positiva
+                query_results = [result for result in query_results if result[0]]
+        elif depth > 0:
+            query_results = buscador.score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds,
+                                                   max(depth, RERANK_DEPTH) if self.boost else depth)
+        else:
+            if zero_similarities is None:
+                zero_similarities = buscador.zero_similarity_results(document_norms)
+            query_results = buscador.score_query(postings, document_norms, query, term_rank, zero_similarities)
+        if self.boost:
+            query_results = self.boosted(query_results, query)
+        return query_results[:depth] if depth > 0 else query_results
+
+    def matching_documents(self, postings, term_rank, constraints):
+        # Candidatos: documentos com todos os termos dos operadores, pela interseção dos cursores
+        # do modelo vetorial (compressao.intersect), que saltam blocos inteiros de postings
+        # comprimidos. As posições só são decodificadas para os candidatos.
+        terms = {term for operator_terms, slop in constraints for term in operator_terms}
+        if any(term not in postings or self.index.postings(term) is None for term in terms):
+            return set()
+        terms = sorted(terms, key=lambda term: len(self.index.postings(term).doc_ids))
+        cursors = [buscador.posting_cursor(term_rank[term], postings[term]) for term in terms]
+        return {int(doc_id) for doc_id in intersect(cursors)
+                if all(self.index.matches(doc_id, operator_terms, slop) for operator_terms, slop in constraints)}
+
+    def boosted(self, query_results, query):
+        term_postings = [posting for posting in map(self.index.postings, set(query)) if posting is not None]
+        if len(term_postings) < 2:
+            return query_results
+        results = []
+        for similarity, doc_id in query_results:
+            if similarity:
+                positions = []
+                for posting in term_postings:
+                    i = posting.find(doc_id)
+                    if i >= 0:
+                        positions.append(posting.positions(i))
+                if len(positions) > 1:
+                    similarity *= 1 + self.boost * len(positions) / minimum_window(positions)
+            results.append((similarity, doc_id))
+        results.sort(reverse=True)
+        return results
+
+def load_positional_search(search_config, current_directory):
+    # None quando busca.cfg não tem a instrução POSICOES
+    if 'POSICOES' not in search_config:
+        return None
+    index_file = os.path.join(current_directory, search_config['POSICOES'])
+    logging.info("\nAbrindo Índice Posicional - Arquivo %s", index_file)
+    return PositionalSearch(open_positional_index(index_file), float(search_config.get('PROXIMIDADE', 0)))
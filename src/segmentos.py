@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+
+# Indexação incremental: um segmento por arquivo XML de origem, com as frequências de
+# cada termo por documento. O manifesto guarda o hash de cada arquivo, de modo que
+# apenas arquivos novos ou alterados sejam lidos e tokenizados novamente. A assinatura
+# do analisador (stemming e stop words) também é guardada: mudá-la refaz todos os segmentos.
+#
+# Os arquivos são identificados pelo caminho relativo ao diretório do projeto, de modo que
+# mover o diretório não refaz os segmentos. O nome do segmento junta o nome do arquivo a um
+# hash desse caminho: arquivos de mesmo nome em diretórios diferentes têm segmentos próprios.
+#
+# manifesto.json: {"arquivos": [{"arquivo": ..., "hash": ..., "segmento": ..., "analisador": ...}, ...]}
+# <segmento>.json: {"termos": {termo: [[DocID, tf], ...]}}
+MANIFEST_FILE = 'manifesto.json'
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(segment_dir):
+    manifest_path = os.path.join(segment_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, 'r') as file:
+        return json.load(file)['arquivos']
+
+def write_manifest(segment_dir, entries):
+    with open(os.path.join(segment_dir, MANIFEST_FILE), 'w') as file:
+        json.dump({'arquivos': entries}, file, indent=1)
+
+def relative_path(xml_file, base_dir):
+    # Caminho com '/' como separador, o mesmo no manifesto em qualquer sistema
+    return os.path.relpath(xml_file, base_dir).replace(os.sep, '/')
+
+def segment_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha256(path.encode('utf-8')).hexdigest()[:12]}.json"
+
+def segment_from_inverted_list(inverted_list):
+    # Frequências por documento de uma lista invertida parcial (postings em ordem de documento)
+    segment = {}
+    for term, doc_ids in inverted_list.items():
+        frequencies = {}
+        for doc_id in doc_ids:
+            frequencies[doc_id] = frequencies.get(doc_id, 0) + 1
+        segment[term] = frequencies
+    return segment
+
+def write_segment(segment_path, segment):
+    with open(segment_path, 'w') as file:
+        json.dump({'termos': {term: list(frequencies.items()) for term, frequencies in segment.items()}}, file)
+
+def load_segment(segment_path):
+    with open(segment_path, 'r') as file:
+        terms = json.load(file)['termos']
+    return {term: dict(frequencies) for term, frequencies in terms.items()}
+
+def update_segments(xml_files, segment_dir, build_partial_lists, analyzer_signature=None, base_dir='.'):
+    # Atualiza os segmentos dos arquivos configurados e retorna-os na ordem de xml_files.
+    # base_dir é o diretório do projeto, ao qual os caminhos do manifesto são relativos.
+    # build_partial_lists recebe os arquivos novos ou alterados e devolve uma lista
+    # invertida parcial por arquivo (ver main.build_partial_inverted_list).
+    os.makedirs(segment_dir, exist_ok=True)
+    previous = {entry['arquivo']: entry for entry in load_manifest(segment_dir)}
+
+    entries = []
+    changed = []
+    for xml_file in xml_files:
+        path = relative_path(xml_file, base_dir)
+        digest = file_hash(xml_file)
+        entry = previous.get(path)
+        if (entry is None or entry['hash'] != digest or entry.get('analisador') != analyzer_signature
+                or not os.path.exists(os.path.join(segment_dir, entry['segmento']))):
+            changed.append(xml_file)
+            entry = {'arquivo': path, 'hash': digest, 'segmento': segment_name(path), 'analisador': analyzer_signature}
+        else:
+            logging.info("Arquivo %s Inalterado - Segmento %s Reaproveitado", xml_file, entry['segmento'])
+        entries.append(entry)
+
+    built = {}
+    if changed:
+        for xml_file, partial in zip(changed, build_partial_lists(changed)):
+            built[relative_path(xml_file, base_dir)] = segment_from_inverted_list(partial)
+
+    segments = []
+    for entry in entries:
+        segment_path = os.path.join(segment_dir, entry['segmento'])
+        if entry['arquivo'] in built:
+            write_segment(segment_path, built[entry['arquivo']])
+            segments.append(built[entry['arquivo']])
+        else:
+            segments.append(load_segment(segment_path))
+
+    # Segmentos de arquivos removidos da configuração são descartados
+    current_segments = {entry['segmento'] for entry in entries}
+    for entry in previous.values():
+        segment_path = os.path.join(segment_dir, entry['segmento'])
+        if entry['segmento'] not in current_segments and os.path.exists(segment_path):
+            os.remove(segment_path)
+
+    write_manifest(segment_dir, entries)
+    logging.info("\n%s Segmentos Reconstruídos, %s Reaproveitados", len(changed), len(entries) - len(changed))
+    return segments
+
+def load_segments(segment_dir):
+    return [load_segment(os.path.join(segment_dir, entry['segmento'])) for entry in load_manifest(segment_dir)]
+
+def merge_segments(segments):
+    # Frequências globais de cada termo, na ordem dos arquivos (segmentos com DocIDs disjuntos)
+    merged = {}
+    for segment in segments:
+        for term, frequencies in segment.items():
+            if term in merged:
+                merged[term].update(frequencies)
+            else:
+                merged[term] = dict(frequencies)
+    return merged
+
+def inverted_list_from_segments(segments):
+    # Lista invertida no formato de generate_inverted_list (DocID repetido tf vezes)
+    inverted_list = {}
+    for term, frequencies in merge_segments(segments).items():
+        doc_ids = []
+        for doc_id, tf in frequencies.items():
+            doc_ids += [doc_id] * tf
+        inverted_list[term] = doc_ids
+    return inverted_list
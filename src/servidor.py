@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import buscador
+from analisador import load_analyzer, load_stop_words
+from cache_consultas import ModelVersion, QueryResultCache
+
+# Servidor de busca em memória: carrega o modelo vetorial uma única vez e responde
+# consultas por HTTP/JSON em localhost. Quando os arquivos do modelo (INDICE, ou MODELO e
+# NORMAS, e POSICOES) mudam, o modelo é recarregado na requisição seguinte e o cache de
+# consultas é esvaziado.
+#
+# Uso: python src/servidor.py  (configuração em busca.cfg, instrução opcional PORTA)
+#
+#   POST /busca  {"consultas": ["texto", ...] ou {"id": "texto", ...}, "k": 10}
+#             -> {"resultados": [{"consulta": id, "documentos": [[DocID, similaridade], ...]}],
+#                 "latencia_ms": ...}
+#   GET /saude -> {"status": "ok", "requisicoes": ..., "latencia_media_ms": ..., "cache": {...}}
+DEFAULT_PORT = 8080
+DEFAULT_DEPTH = 10
+
+class SearchServer:
+    def __init__(self, postings, document_norms, term_upper_bounds, term_rank, analyzer, default_depth=DEFAULT_DEPTH,
+                 cache=None, positional=None, model_loader=None, model_version=None):
+        self.postings = postings
+        self.document_norms = document_norms
+        self.term_upper_bounds = term_upper_bounds
+        self.term_rank = term_rank
+        self.analyzer = analyzer
+        self.default_depth = default_depth
+        self.cache = cache
+        self.positional = positional
+        # model_loader() -> (postings, normas, limites superiores, ordem dos termos, índice posicional)
+        self.model_loader = model_loader
+        self.model_version = model_version
+        self.zero_similarities = None
+        self.requests = 0
+        self.total_latency = 0.0
+        self.reloads = 0
+
+    def refresh_model(self):
+        # Uma verificação por requisição, com os arquivos lidos no máximo uma vez por intervalo.
+        # Se a carga falha (arquivo sendo gravado), o modelo anterior continua em uso e a carga
+        # é tentada de novo no próximo intervalo.
+        if self.model_version is None or not self.model_version.changed():
+            return
+        try:
+            model = self.model_loader()
+        except (OSError, ValueError, SyntaxError) as error:
+            logging.warning("\nFalha ao Recarregar o Modelo Vetorial: %s", error)
+            return
+        self.model_version.mark_loaded()
+        self.postings, self.document_norms, self.term_upper_bounds, self.term_rank, self.positional = model
+        self.zero_similarities = None
+        if self.cache is not None:
+            self.cache.clear()
+        self.reloads += 1
+        logging.info("\nModelo Vetorial Recarregado")
+
+    def search(self, query_text, depth):
+        query = self.analyzer.terms(query_text)
+        if self.cache is not None:
+            results = self.cache.get(query, depth)
+            if results is not None:
+                return results
+        if depth <= 0 and self.zero_similarities is None:
+            self.zero_similarities = buscador.zero_similarity_results(self.document_norms)
+        if self.positional is not None:
+            results = self.positional.search(self.postings, self.document_norms, query, self.term_rank,
+                                             self.term_upper_bounds, depth, self.zero_similarities)
+        elif depth > 0:
+            results = buscador.score_query_top_k(self.postings, self.document_norms, query, self.term_rank,
+                                             self.term_upper_bounds, depth)
+        else:
+            results = buscador.score_query(self.postings, self.document_norms, query, self.term_rank, self.zero_similarities)
+        if self.cache is not None:
+            self.cache.put(query, depth, results)
+        return results
+
+    def handle_search(self, body):
+        request = json.loads(body)
+        self.refresh_model()
+        queries = request.get('consultas', [])
+        if isinstance(queries, str):
+            queries = [queries]
+        if isinstance(queries, list):
+            queries = dict(enumerate(queries, start=1))
+        depth = int(request.get('k', self.default_depth))
+
+        results = []
+        for query_id, query_text in queries.items():
+            documents = [[int(doc_id), float(similarity)] for similarity, doc_id in self.search(query_text, depth)]
+            results.append({'consulta': query_id, 'documentos': documents})
+        return {'resultados': results}
+
+    def handle_health(self):
+        average = self.total_latency / self.requests if self.requests else 0.0
+        health = {'status': 'ok', 'requisicoes': self.requests, 'latencia_media_ms': average,
+                  'recargas_modelo': self.reloads}
+        if self.cache is not None:
+            health['cache'] = self.cache.stats()
+        return health
+
+    def dispatch(self, method, path, body):
+        if path == '/busca' and method == 'POST':
+            return 200, self.handle_search(body)
+        if path == '/saude' and method == 'GET':
+            return 200, self.handle_health()
+        if path in ('/busca', '/saude'):
+            return 405, {'erro': 'Método não permitido'}
+        return 404, {'erro': 'Recurso não encontrado'}
+
+    async def handle_connection(self, reader, writer):
+        # Conexões keep-alive: várias requisições podem chegar pela mesma conexão
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                start_time = time.perf_counter()
+                try:
+                    status, response = self.dispatch(method, path, body)
+                except (ValueError, TypeError, AttributeError) as error:
+                    status, response = 400, {'erro': f'Requisição inválida: {error}'}
+                latency = (time.perf_counter() - start_time) * 1000
+                self.requests += 1
+                self.total_latency += latency
+                response['latencia_ms'] = latency
+                logging.debug("%s %s %s - %.3f ms", method, path, status, latency)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                payload = json.dumps(response).encode('utf-8')
+                writer.write((f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+                              'Content-Type: application/json; charset=utf-8\r\n'
+                              f'Content-Length: {len(payload)}\r\n'
+                              f'X-Latencia-ms: {latency:.3f}\r\n'
+                              f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+def model_files(search_config, current_directory):
+    # Arquivos dos quais o servidor carrega o modelo de busca
+    names = ['INDICE'] if 'INDICE' in search_config else ['MODELO', 'NORMAS']
+    if 'POSICOES' in search_config:
+        names.append('POSICOES')
+    return [os.path.join(current_directory, search_config[name]) for name in names]
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+async def serve(search_server, port):
+    server = await asyncio.start_server(search_server.handle_connection, '127.0.0.1', port, backlog=1024)
+    logging.info("\nServidor de Busca em http://127.0.0.1:%s", port)
+    async with server:
+        await server.serve_forever()
+
+def main_server():
+    logging.info("\nInício Servidor de Busca")
+    current_directory = os.getcwd()
+    logging.info("\nLeitura do arquivo de configurações - busca.cfg")
+    search_config = buscador.read_configuration_file(os.path.join(current_directory, 'src', 'busca.cfg'))
+
+    # O modelo vetorial é carregado uma vez, permanece residente e só é recarregado quando
+    # os seus arquivos mudam
+    def load_model():
+        positional = None
+        if 'POSICOES' in search_config:
+            # Índice posicional: consultas com operadores de frase ("...") e proximidade ("..."~k)
+            from posicional import load_positional_search
+            positional = load_positional_search(search_config, current_directory)
+        return (*buscador.load_search_model(search_config, current_directory), positional)
+
+    start_time = time.time()
+    model_version = ModelVersion(model_files(search_config, current_directory))
+    postings, document_norms, term_upper_bounds, term_rank, positional = load_model()
+    logging.info("\nModelo Vetorial Carregado em %.3f segundos", time.time() - start_time)
+
+    depth = int(search_config.get('PROFUNDIDADE', 0)) or DEFAULT_DEPTH
+    cache = None
+    if 'CACHE' in search_config:
+        # Cache LRU de resultados, esvaziado quando o modelo vetorial é recarregado
+        cache = QueryResultCache(int(search_config['CACHE']))
+    # Consultas analisadas como os documentos (stop words e stemming de config.txt)
+    analyzer = load_analyzer(current_directory, load_stop_words(os.path.join(current_directory, 'stopwords.txt')))
+    # O nltk é importado aqui, antes de aceitar conexões, e não na primeira requisição
+    analyzer.terms('')
+    if positional is not None:
+        from posicional import PositionalQueryAnalyzer
+        analyzer = PositionalQueryAnalyzer(analyzer)
+    search_server = SearchServer(postings, document_norms, term_upper_bounds, term_rank, analyzer, depth, cache,
+                                 positional, load_model, model_version)
+    asyncio.run(serve(search_server, int(search_config.get('PORTA', DEFAULT_PORT))))
+
+if __name__ == "__main__":
+    main_server()
@@ -0,0 +1,97 @@
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from avalia import RECALL_LEVELS, evaluate_files
+
+# Métricas vetorizadas de avalia.py comparadas com um cálculo consulta a consulta, sobre
+# rankings sintéticos e sobre RESULT\RESULTADOS.csv
+
+def reference_metrics(ranking, relevant):
+    # Métricas de uma consulta a partir do ranking (DocIDs em ordem) e dos DocIDs relevantes
+    relevant_ranks = [rank for rank, doc_id in enumerate(ranking, start=1) if doc_id in relevant]
+    precisions = [hits / rank for hits, rank in enumerate(relevant_ranks, start=1)]
+    recalls = [hits / len(relevant) for hits in range(1, len(relevant_ranks) + 1)]
+
+    def hits_at(limit):
+        return sum(1 for rank in relevant_ranks if rank <= limit)
+
+    p_at_10 = hits_at(10) / 10
+    recall_at_10 = hits_at(10) / len(relevant)
+    metrics = {
+        'p@5': hits_at(5) / 5,
+        'p@10': p_at_10,
+        'r_precision': hits_at(len(relevant)) / len(relevant),
+        'map': sum(precisions) / len(relevant),
+        'mrr': 1 / relevant_ranks[0] if relevant_ranks else 0.0,
+        'f1@10': 2 * p_at_10 * recall_at_10 / (p_at_10 + recall_at_10) if p_at_10 + recall_at_10 else 0.0,
+    }
+    eleven_points = [max((precision for precision, recall in zip(precisions, recalls) if recall >= level - 1e-12),
+                         default=0.0) for level in RECALL_LEVELS]
+    return metrics, eleven_points
+
+def read_rankings(results_file):
+    rankings = {}
+    with open(results_file, 'r') as file:
+        for line in file:
+            query, result = line.strip().split(';')
+            rankings.setdefault(int(query), []).append(int(result.strip('[]').split(',')[1]))
+    return rankings
+
+def read_judgments(judgments_file):
+    judgments = {}
+    with open(judgments_file, 'r') as file:
+        next(file)
+        for line in file:
+            query, doc_id, score = map(int, line.split(';'))
+            judgments.setdefault(query, set()).add(doc_id)
+    return judgments
+
+def assert_matches_reference(results_file, judgments_file):
+    rankings = read_rankings(results_file)
+    judgments = read_judgments(judgments_file)
+    evaluated, per_query, eleven_points, summary = evaluate_files(results_file, judgments_file)
+
+    # Todas as consultas julgadas, inclusive as ausentes dos resultados (zero em tudo)
+    assert evaluated.tolist() == sorted(judgments)
+    for i, query in enumerate(evaluated.tolist()):
+        metrics, points = reference_metrics(rankings.get(query, []), judgments[query])
+        for name, value in metrics.items():
+            assert math.isclose(per_query[name][i], value, abs_tol=1e-12), (query, name)
+        assert all(math.isclose(a, b, abs_tol=1e-12) for a, b in zip(eleven_points[i], points)), query
+    assert math.isclose(summary['map'], sum(per_query['map']) / len(evaluated))
+
+def write_synthetic_files(directory, seed=0):
+    # Consultas fora de ordem, consultas sem julgamento, consultas julgadas sem resultados,
+    # rankings truncados e documentos relevantes que nunca são recuperados
+    generator = random.Random(seed)
+    documents = list(range(1, 301))
+    results_file = os.path.join(directory, 'RESULTADOS.csv')
+    judgments_file = os.path.join(directory, 'expected_results.csv')
+    with open(judgments_file, 'w') as file:
+        file.write('QueryNumber;DocNumber;DocScore\n')
+        for query in range(1, 41):
+            if query % 9 == 0:
+                continue
+            for doc_id in generator.sample(documents, generator.randint(1, 30)):
+                file.write(f'{query};{doc_id};{generator.randint(1, 8)}\n')
+    result_queries = [query for query in range(1, 46) if query % 7]
+    generator.shuffle(result_queries)
+    with open(results_file, 'w') as file:
+        for query in result_queries:
+            ranking = generator.sample(documents, generator.choice((3, 10, 50, 300)))
+            for position, doc_id in enumerate(ranking, start=1):
+                file.write(f'{query};[{position}, {doc_id}, {generator.random()}]\n')
+    return results_file, judgments_file
+
+def test_evaluate_matches_reference_on_synthetic_rankings(tmp_path):
+    for seed in range(3):
+        assert_matches_reference(*write_synthetic_files(tmp_path, seed))
+
+def test_evaluate_matches_reference_on_committed_results():
+    assert_matches_reference(os.path.join(ROOT, 'RESULT', 'RESULTADOS.csv'),
+                             os.path.join(ROOT, 'RESULT', 'expected_results.csv'))
@@ -0,0 +1,56 @@
+import os
+import re
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import main
+from buscador import score_query, score_query_top_k, search_model_from_vector_model, zero_similarity_results
+from indice_binario import open_binary_index, write_binary_index
+
+# Busca top-k (MaxScore) comparada com o início do ranking completo, sobre o modelo vetorial
+# de RESULT\inverted_list.csv e as consultas de RESULT\processed_queries.csv. Os termos das
+# consultas são as palavras do texto, sem o tokenizador do nltk. Execução: python -m pytest tests
+DEPTHS = (1, 5, 10, 50)
+
+@pytest.fixture(scope='module')
+def vector_model():
+    inverted_list = main.load_inverted_list(os.path.join(ROOT, 'RESULT', 'inverted_list.csv'))
+    vector_model = main.process_inverted_list(inverted_list)
+    document_norms = main.compute_document_norms(vector_model)
+    term_upper_bounds = main.compute_term_upper_bounds(
+        {term: document_data.items() for term, (idf, document_data) in vector_model.items()}, document_norms)
+    return inverted_list, vector_model, document_norms, term_upper_bounds
+
+@pytest.fixture(scope='module')
+def queries():
+    with open(os.path.join(ROOT, 'RESULT', 'processed_queries.csv'), 'r') as file:
+        next(file)
+        return [re.findall(r'[A-Z0-9]+', line.split(';', 1)[1]) for line in file if ';' in line]
+
+def search_model(vector_model, representation, directory):
+    # (postings, normas, limites superiores, ordem dos termos) em memória, no índice binário
+    # mapeado ou no índice binário com postings comprimidos
+    inverted_list, vector_model, document_norms, term_upper_bounds = vector_model
+    if representation == 'memoria':
+        return search_model_from_vector_model(vector_model, document_norms, term_upper_bounds)
+    index_file = os.path.join(directory, f'{representation}.bin')
+    write_binary_index(vector_model, document_norms, term_upper_bounds, index_file,
+                       inverted_list if representation == 'comprimido' else None)
+    index = open_binary_index(index_file)
+    return index.postings, index.document_norms, index.term_upper_bounds, index.term_rank
+
+@pytest.mark.parametrize('representation', ['memoria', 'binario', 'comprimido'])
+def test_top_k_matches_full_ranking(vector_model, queries, representation, tmp_path):
+    postings, document_norms, term_upper_bounds, term_rank = search_model(vector_model, representation, tmp_path)
+    zero_similarities = zero_similarity_results(document_norms)
+    for query in queries:
+        # O top-k só tem documentos de similaridade positiva
+        full_ranking = [result for result in score_query(postings, document_norms, query, term_rank, zero_similarities)
+                        if result[0]]
+        for depth in DEPTHS:
+            top_k = score_query_top_k(postings, document_norms, query, term_rank, term_upper_bounds, depth)
+            assert [(float(similarity), int(doc_id)) for similarity, doc_id in top_k] == \
+                   [(float(similarity), int(doc_id)) for similarity, doc_id in full_ranking[:depth]]
@@ -0,0 +1,76 @@
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from buscador import PostingCursor
+from compressao import END_OF_POSTINGS, CompressedPostingList, encode_postings, intersect
+
+# Postings comprimidos (compressao.py): ida e volta pela codificação e cursores com saltos
+# entre blocos comparados com o cursor sobre a lista descomprimida
+IDF = 2.5
+BLOCK_SIZES = (1, 3, 128)
+
+def random_postings(seed, length, max_gap=50):
+    generator = random.Random(seed)
+    doc_id = 0
+    doc_frequencies = []
+    for _ in range(length):
+        doc_id += generator.randint(1, max_gap)
+        doc_frequencies.append((doc_id, generator.randint(1, 300)))
+    return doc_frequencies
+
+def compressed_list(doc_frequencies, block_size):
+    occurrences = sum(tf for doc_id, tf in doc_frequencies)
+    return CompressedPostingList(encode_postings(doc_frequencies, block_size), IDF, occurrences)
+
+def test_round_trip():
+    for length in (0, 1, 127, 128, 129, 1000):
+        doc_frequencies = random_postings(length, length)
+        occurrences = sum(tf for doc_id, tf in doc_frequencies)
+        for block_size in BLOCK_SIZES:
+            postings = compressed_list(doc_frequencies, block_size)
+            doc_ids, weights = postings.decode()
+            assert len(postings) == length
+            assert doc_ids == [doc_id for doc_id, tf in doc_frequencies]
+            assert weights == [(tf / occurrences) * IDF for doc_id, tf in doc_frequencies]
+
+def test_round_trip_large_gaps():
+    # DocIDs e frequências que ocupam vários bytes em variable-byte
+    doc_frequencies = [(1, 1), (200, 128), (70000, 16384), (2 ** 31 - 1, 2 ** 21)]
+    postings = compressed_list(doc_frequencies, 2)
+    assert postings.decode()[0] == [doc_id for doc_id, tf in doc_frequencies]
+
+def test_seek_matches_posting_cursor():
+    doc_frequencies = random_postings(7, 1000)
+    generator = random.Random(11)
+    for block_size in BLOCK_SIZES:
+        postings = compressed_list(doc_frequencies, block_size)
+        for trial in range(20):
+            compressed = postings.cursor(0)
+            plain = PostingCursor(0, *postings.decode())
+            target = 0
+            while plain.doc != END_OF_POSTINGS:
+                # Alvos que caem no mesmo bloco, no seguinte ou muitos blocos adiante
+                target += generator.choice((1, 10, 200, 5000))
+                compressed.seek(target)
+                plain.seek(target)
+                assert compressed.doc == plain.doc
+                if plain.doc != END_OF_POSTINGS:
+                    assert math.isclose(compressed.weight(), plain.weight())
+                    if generator.random() < 0.5:
+                        compressed.next()
+                        plain.next()
+                        assert compressed.doc == plain.doc
+            assert compressed.doc == END_OF_POSTINGS
+
+def test_intersect_matches_set_intersection():
+    lists = [random_postings(seed, length, max_gap) for seed, length, max_gap in ((1, 2000, 3), (2, 500, 12), (3, 100, 60))]
+    expected = sorted(set.intersection(*({doc_id for doc_id, tf in doc_frequencies} for doc_frequencies in lists)))
+    for block_size in BLOCK_SIZES:
+        cursors = [compressed_list(doc_frequencies, block_size).cursor(rank) for rank, doc_frequencies in enumerate(lists)]
+        # Menor lista primeiro, como em posicional.PositionalSearch.matching_documents
+        assert intersect(cursors[::-1]) == expected
@@ -0,0 +1,57 @@
+import math
+import os
+import sys
+from ast import literal_eval
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import main
+from analisador import Analyzer, word_tokenize
+
+# Pesos do Indexador comparados com o modelo vetorial de referência em RESULT\vector_model.csv
+# (gerado sem stemming). Execução: python -m pytest tests
+XML_FILES = [os.path.join(ROOT, 'data', f'cf{year}.xml') for year in range(74, 80)]
+REL_TOL = 1e-9
+
+def load_expected_weights():
+    # vector_model.csv: termo;{DocID: peso, ...}
+    weights = {}
+    with open(os.path.join(ROOT, 'RESULT', 'vector_model.csv'), 'r') as file:
+        next(file)
+        for line in file:
+            term, data = line.rstrip('\n').split(';')[:2]
+            weights[term] = literal_eval(data)
+    return weights
+
+def weights_match(vector_model, term, expected):
+    idf, document_data = vector_model[term]
+    return document_data.keys() == expected.keys() and all(
+        math.isclose(document_data[document], weight, rel_tol=REL_TOL) for document, weight in expected.items())
+
+def test_weights_match_vector_model_csv():
+    # Cada (termo, documento, peso) do Indexador a partir da lista invertida de referência
+    expected = load_expected_weights()
+    vector_model = main.process_inverted_list(main.load_inverted_list(os.path.join(ROOT, 'RESULT', 'inverted_list.csv')))
+    assert vector_model.keys() == expected.keys()
+    mismatched = [term for term in expected if not weights_match(vector_model, term, expected[term])]
+    assert not mismatched
+
+def test_weights_from_cf_xml_match_vector_model_csv():
+    # Modelo construído da coleção CF em XML. O analisador descarta os termos só de pontuação,
+    # que o modelo de referência ainda tem, e a tokenização de abreviações e aspas varia entre
+    # versões do nltk: exige-se que quase todos os termos tenham exatamente os mesmos pesos
+    try:
+        word_tokenize('Dados do nltk.')
+    except LookupError:
+        pytest.skip('dados do tokenizador do nltk (punkt_tab) não instalados')
+    expected = load_expected_weights()
+    analyzer = Analyzer(main.load_stop_words(os.path.join(ROOT, 'stopwords.txt')), stemming=False)
+    vector_model = main.process_inverted_list(main.generate_inverted_list(main.iter_xml_records(XML_FILES, analyzer)))
+
+    terms = [term for term in expected if any(character.isalnum() for character in term)]
+    matched = [term for term in terms if term in vector_model and weights_match(vector_model, term, expected[term])]
+    assert len(matched) >= 0.95 * len(terms)
+    for term in ('PSEUDOMONAS', 'SIGNIFICANCE', 'CYSTIC', 'FIBROSIS'):
+        assert weights_match(vector_model, term, expected[term])